@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+Admission control for transcription jobs.
+
+Each job is costed up front as estimated processing seconds (audio duration × the
+model's real-time factor). At most `max_running` jobs run at once; the rest wait in a
+bounded FIFO queue. A job is rejected (the server answers 429 + Retry-After) when the
+queue is full, when its estimated wait before starting would exceed `max_wait_s`, or
+when its client already has `per_client` jobs queued or running. Latency then stays
+predictable under a burst instead of every job slowing down together.
+
+    ctl = AdmissionController(max_running=2)
+    ticket = ctl.admit("10.0.0.7", "base.en", audio_s=1800.0)   # or raises Rejected
+    with ticket.run():             # blocks until a run slot is free
+        ...
+    ctl.snapshot()                 # queue depth, backlog, waits, rejections, RTFs
+
+Real-time factors start from rough CPU int8 figures and track measured runs on this host
+(RTF_TABLE, an EWMA per model persisted as JSON and fed by every transcribe_and_diarize).
+
+Model "auto" picks the largest model whose predicted turnaround (queue wait + audio ×
+RTF) meets a target. The choice is re-checked when the job leaves the queue and drops
+to a smaller model if the wait ate into the budget:
+
+    ticket = ctl.admit(client, "auto", audio_s=1800.0, target_s=600.0)
+    ticket.model, ticket.plan      # "base.en", {"predicted_s": ..., "meets_target": True, ...}
+"""
+
+from __future__ import annotations
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+# Processing seconds per audio second (ASR + diarization) at a job's full thread share.
+DEFAULT_RTF = {"tiny.en": 0.10, "base.en": 0.18, "small.en": 0.50, "medium": 1.30}
+UNKNOWN_RTF = 1.0
+RTF_SMOOTHING = 0.3    # weight of the newest measurement
+RTF_DB = Path(os.environ.get("MS_RTF_DB", Path.home() / ".cache" / "meeting_transcriber" / "rtf.json"))
+
+AUTO_MODEL = "auto"
+MODEL_LADDER = ("tiny.en", "base.en", "small.en", "medium")     # smallest → largest
+AUTO_TARGET_S = float(os.environ.get("MS_AUTO_TARGET_S", 600))   # default turnaround for "auto"
+
+# ---------------------- Measured real-time factors ----------------------
+class RtfTable:
+    """
+    Per-model RTF: the first measurement replaces the built-in guess, later ones are
+    blended (EWMA). Persisted so estimates survive restarts and are shared by processes
+    (reloaded when another process rewrites the file).
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path or RTF_DB)
+        self._lock = threading.Lock()
+        self._table = {m: {"rtf": v, "runs": 0} for m, v in DEFAULT_RTF.items()}
+        self._mtime = None
+
+    def _refresh(self):
+        # lock held
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            try:
+                self._table.update(json.loads(self.path.read_text()))
+            except (OSError, ValueError):
+                pass
+            self._mtime = mtime
+
+    def get(self, model: str) -> float:
+        with self._lock:
+            self._refresh()
+            return self._table.get(model, {"rtf": UNKNOWN_RTF})["rtf"]
+
+    def observe(self, model: str, audio_s: float, elapsed_s: float):
+        if audio_s <= 0:
+            return
+        with self._lock:
+            self._refresh()
+            new = elapsed_s / audio_s
+            entry = self._table.setdefault(model, {"rtf": new, "runs": 0})
+            entry["rtf"] = new if not entry["runs"] else (1 - RTF_SMOOTHING) * entry["rtf"] + RTF_SMOOTHING * new
+            entry["runs"] += 1
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(self._table, indent=1))
+                os.replace(tmp, self.path)
+                self._mtime = self.path.stat().st_mtime
+            except OSError:
+                pass   # estimates stay in memory
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {m: {"rtf": round(e["rtf"], 3), "runs": e["runs"]} for m, e in sorted(self._table.items())}
+
+RTF_TABLE = RtfTable()
+
+def choose_model(audio_s: float, target_s: float, wait_s: float = 0.0, rtf: RtfTable | None = None,
+                 models=MODEL_LADDER, ceiling: str | None = None) -> dict:
+    """
+    Largest model (up to `ceiling`) whose predicted turnaround, wait_s + audio_s × RTF,
+    fits in target_s; the smallest one if none does. Returns the plan as a dict.
+    """
+    rtf = rtf or RTF_TABLE
+    if ceiling in models:
+        models = models[:models.index(ceiling) + 1]
+    preds = [(m, wait_s + audio_s * rtf.get(m)) for m in models]
+    fits = [p for p in preds if p[1] <= target_s]
+    model, predicted = fits[-1] if fits else preds[0]
+    return {"model": model, "target_s": round(target_s, 1), "audio_s": round(audio_s, 1),
+            "wait_s": round(wait_s, 1), "predicted_s": round(predicted, 1),
+            "rtf": round(rtf.get(model), 3), "meets_target": bool(fits)}
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+class Ticket:
+    """An admitted job. Holds its queue place until `run()` exits or `cancel()`."""
+
+    def __init__(self, ctl: "AdmissionController", ticket_id: int, client: str, model: str,
+                 audio_s: float, cost_s: float):
+        self.ctl = ctl
+        self.ticket_id = ticket_id
+        self.client = client
+        self.model = model
+        self.audio_s = audio_s
+        self.cost_s = cost_s
+        self.admitted = time.monotonic()
+        self.started = None
+        self.state = "queued"
+        self.target_s = None      # set for model "auto"
+        self.plan = None
+
+    def remaining_s(self, now: float) -> float:
+        if self.started is None:
+            return self.cost_s
+        return max(0.0, self.cost_s - (now - self.started))
+
+    @contextmanager
+    def run(self, on_wait=None):
+        """Wait for a run slot. `on_wait(position, eta_s)` is called once if the job has to queue."""
+        self.ctl._start(self, on_wait)
+        ok = False
+        try:
+            yield self
+            ok = True
+        finally:
+            self.ctl._finish(self, ok)
+
+    def cancel(self):
+        self.ctl._finish(self, False)
+
+class AdmissionController:
+    def __init__(self, max_running: int = 1, max_queued: int = 8, max_wait_s: float = 900.0,
+                 per_client: int = 2, rtf: RtfTable | None = None):
+        self.max_running = max(1, max_running)
+        self.max_queued = max(0, max_queued)
+        self.max_wait_s = max_wait_s
+        self.per_client = max(1, per_client)
+        self._rtf = rtf or RTF_TABLE
+        self._lock = threading.Lock()
+        self._free = threading.Condition(self._lock)
+        self._ids = itertools.count(1)
+        self._queue: deque[Ticket] = deque()
+        self._running: dict[int, Ticket] = {}
+        self._admitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = {"queue_full": 0, "wait_too_long": 0, "client_limit": 0}
+        self._waits = deque(maxlen=500)   # recent queue waits (s)
+
+    # ---- estimates ----
+    def rtf(self, model: str) -> float:
+        return self._rtf.get(model)
+
+    def estimate_cost(self, model: str, audio_s: float) -> float:
+        return max(1.0, audio_s * self.rtf(model))
+
+    # ---- accounting (call with lock held) ----
+    def _backlog_s(self, now: float) -> float:
+        return (sum(t.remaining_s(now) for t in self._running.values())
+                + sum(t.cost_s for t in self._queue))
+
+    def _eta_s(self, now: float, ahead=None) -> float:
+        """Seconds until a job queued behind `ahead` (default: everything) could start."""
+        if ahead is None:
+            if len(self._running) < self.max_running and not self._queue:
+                return 0.0
+            ahead = list(self._queue)
+        work = sum(t.remaining_s(now) for t in self._running.values()) + sum(t.cost_s for t in ahead)
+        return work / self.max_running
+
+    def _client_jobs(self, client: str) -> list:
+        return [t for t in (*self._running.values(), *self._queue) if t.client == client]
+
+    def _reject(self, reason: str, retry_after: float):
+        self._rejected[reason] += 1
+        raise Rejected(reason, retry_after)
+
+    def _check(self, client: str, now: float):
+        mine = self._client_jobs(client)
+        if len(mine) >= self.per_client:
+            self._reject("client_limit", min(t.remaining_s(now) for t in mine))
+        if len(self._running) + len(self._queue) >= self.max_running + self.max_queued:
+            # a place opens when the soonest running job finishes
+            self._reject("queue_full", min((t.remaining_s(now) for t in self._running.values()),
+                                           default=self._eta_s(now)))
+
+    # ---- public API ----
+    def check(self, client: str):
+        """Cheap pre-check before the job's duration is known (e.g. before reading an upload)."""
+        with self._lock:
+            self._check(client, time.monotonic())
+
+    def admit(self, client: str, model: str, audio_s: float, target_s: float | None = None) -> Ticket:
+        """Queue a job or raise Rejected. Model "auto" is resolved against `target_s` and the queue."""
+        with self._lock:
+            now = time.monotonic()
+            self._check(client, now)
+            eta = self._eta_s(now)
+            if eta > self.max_wait_s:
+                self._reject("wait_too_long", eta - self.max_wait_s)
+            plan = None
+            if model == AUTO_MODEL:
+                target_s = target_s or AUTO_TARGET_S
+                plan = choose_model(audio_s, target_s, wait_s=eta, rtf=self._rtf)
+                model = plan["model"]
+            ticket = Ticket(self, next(self._ids), client, model, audio_s, self.estimate_cost(model, audio_s))
+            if plan:
+                ticket.target_s, ticket.plan = target_s, plan
+            self._queue.append(ticket)
+            self._admitted += 1
+            return ticket
+
+    def _start(self, ticket: Ticket, on_wait=None):
+        with self._free:
+            if ticket.state != "queued":
+                raise RuntimeError(f"ticket {ticket.ticket_id} is {ticket.state}")
+            notified = False
+            # FIFO: only the head of the queue may take a free slot.
+            while not (self._queue[0] is ticket and len(self._running) < self.max_running):
+                if on_wait and not notified:
+                    notified = True
+                    pos = self._queue.index(ticket)
+                    eta = self._eta_s(time.monotonic(), list(self._queue)[:pos])
+                    self._lock.release()
+                    try:
+                        on_wait(pos + 1, eta)
+                    finally:
+                        self._lock.acquire()
+                    continue
+                self._free.wait()
+            self._queue.popleft()
+            ticket.started = time.monotonic()
+            ticket.state = "running"
+            if ticket.plan:
+                self._replan(ticket)
+            self._running[ticket.ticket_id] = ticket
+            self._waits.append(ticket.started - ticket.admitted)
+
+    def _replan(self, ticket: Ticket):
+        """Auto model, leaving the queue: if waiting used up the budget, step down (never up)."""
+        waited = ticket.started - ticket.admitted
+        plan = choose_model(ticket.audio_s, ticket.target_s, wait_s=waited, rtf=self._rtf,
+                            ceiling=ticket.model)
+        if plan["model"] != ticket.model:
+            plan["fallback_from"] = ticket.model
+            ticket.model = plan["model"]
+            ticket.cost_s = self.estimate_cost(ticket.model, ticket.audio_s)
+        plan["admitted_plan"] = ticket.plan.get("admitted_plan", ticket.plan)
+        ticket.plan = plan
+
+    def _finish(self, ticket: Ticket, ok: bool):
+        with self._free:
+            if ticket.state == "running":
+                self._running.pop(ticket.ticket_id, None)
+                if ok:
+                    self._completed += 1
+                    if ticket.plan:
+                        ticket.plan["actual_s"] = round(time.monotonic() - ticket.admitted, 1)
+                else:
+                    self._failed += 1
+            elif ticket.state == "queued":
+                try:
+                    self._queue.remove(ticket)
+                except ValueError:
+                    pass
+            ticket.state = "done"
+            self._free.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            waits = sorted(self._waits)
+
+            def pct(p):
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))], 2) if waits else 0.0
+
+            return {
+                "max_running": self.max_running,
+                "max_queued": self.max_queued,
+                "max_wait_s": self.max_wait_s,
+                "per_client": self.per_client,
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "backlog_s": round(self._backlog_s(now), 1),
+                "est_wait_s": round(self._eta_s(now), 1),
+                "admitted": self._admitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": dict(self._rejected),
+                "queue_wait_s": {"avg": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                                 "p50": pct(0.50), "p95": pct(0.95),
+                                 "max": round(waits[-1], 2) if waits else 0.0},
+                "rtf": self._rtf.snapshot(),
+                "jobs": [
+                    {"id": t.ticket_id, "client": t.client, "model": t.model, "state": t.state,
+                     "audio_s": round(t.audio_s, 1), "est_cost_s": round(t.cost_s, 1),
+                     "waited_s": round((t.started or now) - t.admitted, 1)}
+                    for t in (*sorted(self._running.values(), key=lambda t: t.ticket_id), *self._queue)
+                ],
+            }
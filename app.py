@@ -2,11 +2,15 @@
 import streamlit as st
 from pathlib import Path
 import platform, shutil
+from urllib.parse import quote
+
+from recorder_page import recorder_html
 
 # ---------- Safe defaults (UI only) ----------
 DEFAULT_MODEL = "tiny.en"
 DEFAULT_MIN_SPK = 2
 DEFAULT_MAX_SPK = 6
+ASR_MODES = ["sequential", "batched"]
 
 # Try to import the pipeline & local recorder (optional)
 start_recording = stop_recording = transcribe_and_diarize = save_outputs = None
@@ -44,12 +48,25 @@ with st.sidebar:
     st.markdown("### Transcription Settings")
     model_choice = st.selectbox(
         "Whisper Model",
-        ["tiny.en", "base.en", "small.en", "medium"],
+        ["tiny.en", "base.en", "small.en", "medium", "auto"],
         index=["tiny.en", "base.en", "small.en", "medium"].index(DEFAULT_MODEL)
         if DEFAULT_MODEL in ["tiny.en", "base.en", "small.en", "medium"] else 0,
+        help="auto: the largest model predicted to finish within the target turnaround",
     )
+    target_min = st.number_input("Target turnaround (min)", min_value=1.0, max_value=240.0, value=10.0,
+                                 step=1.0, disabled=model_choice != "auto",
+                                 help="Used by auto: measured speed of each model on the server + queue load")
     min_speakers = st.number_input("Min Speakers", min_value=1, max_value=10, value=DEFAULT_MIN_SPK, step=1)
     max_speakers = st.number_input("Max Speakers", min_value=2, max_value=10, value=DEFAULT_MAX_SPK, step=1)
+    asr_mode = st.selectbox("ASR mode", ASR_MODES, index=0,
+                            help="batched decodes VAD-split speech chunks together (higher CPU throughput)")
+    batch_size = st.number_input("ASR batch size", min_value=1, max_value=64, value=8, step=1,
+                                 disabled=asr_mode != "batched")
+    beam_size = st.number_input("Beam size", min_value=1, max_value=10, value=5, step=1)
+    participants_txt = st.text_input("Participants (optional)", value="",
+                                     help="Comma-separated names. Fixes the speaker count; names enrolled "
+                                          "with voiceprints.py label their speakers.")
+    participants = [p.strip() for p in participants_txt.split(",") if p.strip()]
     if min_speakers > max_speakers:
         st.warning("Min speakers cannot be greater than Max speakers. Adjusted automatically.")
         min_speakers = max(1, min_speakers)
@@ -75,119 +92,16 @@ with tab1:
 
     # 👇 ADD THESE 3 LINES (right here)
     base = endpoint.rsplit("/upload", 1)[0] if endpoint.endswith("/upload") else endpoint
-    recorder_url = f"{base}/capture?model={model_choice}&min={int(min_speakers)}&max={int(max_speakers)}"
+    recorder_url = (f"{base}/capture?model={model_choice}&min={int(min_speakers)}&max={int(max_speakers)}"
+                    f"&mode={asr_mode}&batch={int(batch_size)}&beam={int(beam_size)}"
+                    f"&people={quote(','.join(participants))}&target={target_min:g}")
     st.link_button("Open Web Recorder (new tab)", recorder_url,
                    help="Use this if the Start button doesn't open the screen/mic picker on Streamlit Cloud.")
 
     st.components.v1.html(
-        f"""
-<div style="display:flex; gap:8px; align-items:center; margin: 8px 0 4px 0;">
-  <button id="start" style="padding:8px 12px;">Start</button>
-  <button id="stop" style="padding:8px 12px;" disabled>Stop</button>
-</div>
-<pre id="status" style="font-family:monospace; white-space:pre-wrap; background:#0f1117; color:#e6edf3; padding:10px; border-radius:6px; min-height:120px;"></pre>
-
-<script>
-const statusEl = document.getElementById('status');
-let mediaRecorder;
-let recordedChunks = [];
-let mixedStream;
-let ctx, dest, tabStream, micStream;
-
-const MODEL = {repr(model_choice)};
-const MIN_SPK = {int(min_speakers)};
-const MAX_SPK = {int(max_speakers)};
-const ENDPOINT = {repr(endpoint)};
-
-function log(m) {{ statusEl.textContent += (statusEl.textContent ? "\\n" : "") + m; }}
-
-async function wakeApi() {{
-  try {{
-    const base = ENDPOINT.replace(/\\/upload$/, "");
-    await fetch(base + "/health", {{ method: "GET", cache: "no-store" }});
-    log("API is awake.");
-  }} catch (e) {{
-    log("Could not wake API: " + e);
-  }}
-}}
-
-async function startCapture() {{
-  try {{
-    await wakeApi();  // wake before recording/upload
-    const tab = await navigator.mediaDevices.getDisplayMedia({{ video: true, audio: true }});
-    const mic = await navigator.mediaDevices.getUserMedia({{ audio: true }});
-
-    ctx = new (window.AudioContext || window.webkitAudioContext)();
-    dest = ctx.createMediaStreamDestination();
-    const tabSrc = ctx.createMediaStreamSource(tab);
-    const micSrc = ctx.createMediaStreamSource(mic);
-
-    const tabGain = ctx.createGain(); tabGain.gain.value = 1.0;
-    const micGain = ctx.createGain(); micGain.gain.value = 1.0;
-    tabSrc.connect(tabGain).connect(dest);
-    micSrc.connect(micGain).connect(dest);
-
-    recordedChunks = [];
-    tabStream = tab; micStream = mic; mixedStream = dest.stream;
-
-    // Lower bitrate for smaller, faster uploads (~48 kbps)
-    const opts = {{ mimeType: 'audio/webm;codecs=opus', audioBitsPerSecond: 48000 }};
-    mediaRecorder = new MediaRecorder(mixedStream, opts);
-    mediaRecorder.ondataavailable = (e) => {{ if (e.data && e.data.size > 0) recordedChunks.push(e.data); }};
-    mediaRecorder.onstop = onStop;
-
-    mediaRecorder.start(1000); // gather chunks every second
-    document.getElementById('start').disabled = true;
-    document.getElementById('stop').disabled = false;
-
-    statusEl.textContent = "";
-    log("Recording… (selected tab + mic)");
-    log("Tip: Keep the same tab focused to ensure tab audio stays shared.");
-  }} catch (e) {{
-    log("Failed to start capture: " + e);
-  }}
-}}
-
-async function onStop() {{
-  log("Finalizing recording…");
-  try {{
-    const blob = new Blob(recordedChunks, {{ type: 'audio/webm' }});
-    const file = new File([blob], "browser_capture.webm", {{ type: 'audio/webm' }});
-
-    const form = new FormData();
-    form.append('file', file);
-    form.append('model', MODEL);
-    form.append('min_spk', String(MIN_SPK));
-    form.append('max_spk', String(MAX_SPK));
-
-    log("Uploading to: " + ENDPOINT);
-    const resp = await fetch(ENDPOINT, {{ method: 'POST', body: form }});
-    const data = await resp.json();
-    if (data.ok) {{
-      log("Server finished. Saved files (links):");
-      log(JSON.stringify(data.saved, null, 2));
-    }} else {{
-      log("Server returned an error response.");
-    }}
-  }} catch (e) {{
-    log("Upload failed: " + e);
-  }} finally {{
-    try {{ tabStream?.getTracks().forEach(t => t.stop()); micStream?.getTracks().forEach(t => t.stop()); }} catch (_e) {{}}
-    document.getElementById('start').disabled = false;
-    document.getElementById('stop').disabled = true;
-  }}
-}}
-
-document.getElementById('start').onclick = startCapture;
-document.getElementById('stop').onclick = () => {{
-  if (mediaRecorder && mediaRecorder.state !== 'inactive') {{
-    mediaRecorder.stop();
-    log("Stopping recorder…");
-  }}
-}};
-</script>
-        """,
-        height=320,
+        recorder_html(model_choice, min_speakers, max_speakers, asr_mode, batch_size, beam_size,
+                      participants, target_min, endpoint),
+        height=620,
     )
 
 # ---------- TAB 2: Local recorder (optional) ----------
@@ -228,7 +142,27 @@ This uses your existing `start_recording()` / `stop_recording()` that mix the de
                         st.session_state.is_recording = False
                         wav_path = st.session_state.recording_state.wav_path
                         st.info("Transcribing + diarizing (CPU)…")
-                        segs = transcribe_and_diarize(wav_path, model_choice, min_speakers, max_speakers)
+                        bar = st.progress(0, text="Starting…")
+                        live = st.empty()
+                        lines = []
+
+                        def on_event(ev):
+                            # Render pipeline events live (runs in this script thread)
+                            if ev["type"] in ("stage", "progress"):
+                                bar.progress(ev["percent"], text=f"{ev['stage']} {ev['percent']}%")
+                            elif ev["type"] == "model":
+                                st.info(f"Auto model: {ev['model']} (predicted {ev['predicted_s']:.0f}s "
+                                        f"for a {ev['target_s']:.0f}s target)")
+                            elif ev["type"] == "segment":
+                                lines.append(f"[{ev['start']:.1f}–{ev['end']:.1f}] {ev['text']}")
+                                live.code("\n".join(lines[-30:]), language=None)
+
+                        segs = transcribe_and_diarize(wav_path, model_choice, min_speakers, max_speakers,
+                                                      on_event=on_event, asr_mode=asr_mode,
+                                                      batch_size=int(batch_size), beam_size=int(beam_size),
+                                                      participants=participants or None,
+                                                      target_s=float(target_min) * 60)
+                        bar.progress(100, text="done")
                         md, srt, txt = save_outputs(wav_path, segs)
                         st.success(f"Saved:\n- {md}\n- {srt}\n- {txt}")
                     except Exception as e:
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Headless batch transcription for whole directories / globs.
+
+    python batch_transcribe.py ~/recordings "archive/**/*.webm" --workers 4 --model base.en
+
+- Runs files across N worker processes; each worker loads Whisper + ECAPA once.
+- Splits the host's cores between workers (torch threads + CTranslate2 cpu_threads).
+- Skips files whose .md/.srt/.txt outputs already exist (use --force to redo).
+- Prints aggregate throughput (audio hours per wall hour) at the end.
+"""
+
+from __future__ import annotations
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from thread_budget import available_cores
+
+AUDIO_EXTS = (".wav", ".flac", ".mp3", ".m4a", ".ogg", ".opus", ".webm", ".mp4", ".mkv")
+OUTPUT_EXTS = (".md", ".srt", ".txt")
+
+# ---------------------- File discovery ----------------------
+def collect_inputs(inputs, recursive=False, exts=AUDIO_EXTS):
+    """
+    Expand directories and glob patterns into a sorted, de-duplicated list of audio files.
+    Files that would write the same outputs (e.g. browser_x.webm + browser_x.wav) are
+    collapsed to one, preferring .wav.
+    """
+    found = []
+    for item in inputs:
+        p = Path(item).expanduser()
+        if p.is_dir():
+            it = p.rglob("*") if recursive else p.iterdir()
+            found.extend(f for f in it if f.is_file())
+        elif p.is_file():
+            found.append(p)
+        else:
+            found.extend(Path(f) for f in glob.glob(str(p), recursive=True) if Path(f).is_file())
+
+    by_base = {}
+    for f in sorted(set(found)):
+        if f.suffix.lower() not in exts or f.name.endswith(".tmp.wav"):
+            continue
+        base = f.parent / f.stem
+        if base not in by_base or f.suffix.lower() == ".wav":
+            by_base[base] = f
+    return sorted(by_base.values())
+
+def outputs_exist(path: Path) -> bool:
+    base = path.parent / path.stem
+    return all(base.with_suffix(ext).exists() for ext in OUTPUT_EXTS)
+
+# ---------------------- Thread budget ----------------------
+def split_threads(workers: int, cores: int | None = None) -> int:
+    cores = cores or available_cores()
+    return max(1, cores // max(1, workers))
+
+# ---------------------- Worker process ----------------------
+_VERBOSE = False
+
+def _init_worker(model_name: str, threads: int, verbose: bool):
+    # Each worker's THREAD_BUDGET owns its share of the host; set before import.
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MS_CPU_CORES"] = str(threads)
+    os.environ["MS_TORCH_INTEROP"] = "1"
+    os.environ["MS_ASR_WORKERS"] = "1"
+
+    import meeting_transcriber as mt
+    global _VERBOSE
+    _VERBOSE = verbose
+    # Warm both models once so every file in this worker reuses them ("auto" resolves per file).
+    if model_name != mt.AUTO_MODEL:
+        mt.get_asr_model(model_name)
+    mt.get_speaker_encoder()
+
+def _process_file(path: str, model_name: str, min_spk: int, max_spk: int, opts: dict):
+    import meeting_transcriber as mt
+    wav = Path(path)
+    log_cb = (lambda m: print(f"[{wav.name}] {m}", flush=True)) if _VERBOSE else (lambda _m: None)
+    t0 = time.perf_counter()
+    try:
+        segments = mt.transcribe_and_diarize(wav, model_name, min_spk, max_spk, log_cb=log_cb, **opts)
+        mt.save_outputs(wav, segments)
+        err = None
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}"
+    return path, mt.audio_seconds(wav), time.perf_counter() - t0, err
+
+# ---------------------- CLI ----------------------
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Batch transcribe + diarize audio files (CPU).")
+    ap.add_argument("inputs", nargs="+", help="Audio files, directories or glob patterns")
+    ap.add_argument("--model", default=os.environ.get("MS_DEFAULT_MODEL", "tiny.en"),
+                    help="tiny.en|base.en|small.en|medium|auto")
+    ap.add_argument("--target-s", type=float, default=None,
+                    help="--model auto: per-file turnaround target in seconds (default MS_AUTO_TARGET_S)")
+    ap.add_argument("--min-spk", type=int, default=int(os.environ.get("MS_MIN_SPK", 2)))
+    ap.add_argument("--max-spk", type=int, default=int(os.environ.get("MS_MAX_SPK", 6)))
+    ap.add_argument("--asr-mode", choices=["sequential", "batched"], default=None)
+    ap.add_argument("--batch-size", type=int, default=None, help="Chunks per batched ASR decode")
+    ap.add_argument("--beam-size", type=int, default=None)
+    ap.add_argument("--participants", default=None,
+                    help="Comma-separated names present in every file (fixes K; enrolled voiceprints name speakers)")
+    ap.add_argument("-j", "--workers", type=int, default=1, help="Worker processes")
+    ap.add_argument("--threads", type=int, default=0,
+                    help="Threads per worker (default: available cores / workers)")
+    ap.add_argument("-r", "--recursive", action="store_true", help="Recurse into directories")
+    ap.add_argument("--force", action="store_true", help="Re-run files whose outputs already exist")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Stream per-file pipeline logs")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    min_spk = max(1, min(args.min_spk, args.max_spk))
+    max_spk = max(min_spk, args.max_spk)
+
+    files = collect_inputs(args.inputs, recursive=args.recursive)
+    todo = files if args.force else [f for f in files if not outputs_exist(f)]
+    skipped = len(files) - len(todo)
+    if not todo:
+        print(f"Nothing to do ({len(files)} file(s) found, {skipped} already transcribed).")
+        return 0
+
+    workers = max(1, min(args.workers, len(todo)))
+    threads = args.threads or split_threads(workers)
+    print(f"Transcribing {len(todo)} file(s) with {workers} worker(s) × {threads} thread(s), "
+          f"model={args.model} (skipped {skipped} already done).", flush=True)
+
+    ok = failed = 0
+    audio_s = 0.0
+    t0 = time.perf_counter()
+    # spawn: never fork a parent that may already hold torch / OpenMP thread pools
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             initializer=_init_worker,
+                             initargs=(args.model, threads, args.verbose)) as pool:
+        people = [p.strip() for p in (args.participants or "").split(",") if p.strip()] or None
+        opts = {"asr_mode": args.asr_mode, "batch_size": args.batch_size, "beam_size": args.beam_size,
+                "participants": people, "target_s": args.target_s}
+        futs = [pool.submit(_process_file, str(f), args.model, min_spk, max_spk, opts) for f in todo]
+        for i, fut in enumerate(as_completed(futs), 1):
+            path, dur, elapsed, err = fut.result()
+            if err:
+                failed += 1
+                print(f"[{i}/{len(todo)}] FAILED {path}: {err}", flush=True)
+            else:
+                ok += 1
+                audio_s += dur
+                rtf = elapsed / dur if dur else float("nan")
+                print(f"[{i}/{len(todo)}] {path} ({dur / 60:.1f} min audio, {elapsed:.1f}s, RTF {rtf:.2f})",
+                      flush=True)
+    wall_s = time.perf_counter() - t0
+
+    audio_h, wall_h = audio_s / 3600.0, wall_s / 3600.0
+    print(f"\nDone: {ok} ok, {failed} failed, {skipped} skipped.")
+    print(f"Audio {audio_h:.2f} h in {wall_h:.2f} h wall → "
+          f"throughput {audio_h / wall_h if wall_h else 0.0:.2f} audio-h/wall-h")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
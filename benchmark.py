@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks / guards for the transcription stack.
+
+    python benchmark.py imports            # cold import time of the web entry points
+    python benchmark.py pages              # render the recorder pages, syntax-check their JS
+    python benchmark.py embeddings a.wav   # ECAPA backend throughput + parity
+    python benchmark.py asr a.wav          # sequential vs batched Whisper RTF
+    python benchmark.py diarize a.wav      # uniform vs adaptive embedding: ECAPA calls + DER
+    python benchmark.py calibrate a.wav    # measure each model's pipeline RTF for model "auto"
+
+`imports` runs each module in a fresh interpreter and fails (exit 1) if importing it
+pulls in the ML stack or exceeds the time budget, so slow cold starts are caught early.
+`pages` renders the /capture page and the Streamlit recorder component and runs each
+inline <script> through `node --check`; a Python-side escaping slip (e.g. "\\n" written
+as "\n") otherwise only shows up as a dead page in the browser.
+`embeddings` times every embedding backend on the same audio and checks each against
+the eager SpeechBrain reference by per-window cosine similarity.
+`asr` reports the real-time factor (processing time / audio time) of each ASR mode.
+`diarize` counts ECAPA windows for uniform vs coarse-to-fine embedding and compares the
+resulting speaker tracks: frame disagreement after the best label mapping (a DER proxy
+with uniform as reference), plus frame DER against an RTTM reference when given.
+`calibrate` runs the full pipeline once per model and records the measured RTFs in the
+table the "auto" model mode plans with (admission.RTF_TABLE).
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# Modules that must only be imported on first pipeline use.
+HEAVY_MODULES = ("torch", "speechbrain", "faster_whisper", "ctranslate2", "scipy", "sklearn")
+
+# ---------------------- Import time ----------------------
+_IMPORT_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": dt, "heavy": heavy}}))
+"""
+
+def measure_import(module: str, repeat: int = 3):
+    """Best-of-N cold import time of `module` in a fresh interpreter."""
+    best = None
+    for _ in range(repeat):
+        code = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+        out = subprocess.run([sys.executable, "-c", code], cwd=str(HERE),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{out.stderr.strip()}")
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or res["seconds"] < best["seconds"]:
+            best = res
+    return best
+
+def cmd_imports(args):
+    failed = False
+    for module in args.modules:
+        res = measure_import(module, repeat=args.repeat)
+        status = "ok"
+        if res["heavy"]:
+            status = f"FAIL (eagerly imported: {', '.join(res['heavy'])})"
+            failed = True
+        elif res["seconds"] > args.max_seconds:
+            status = f"FAIL (over {args.max_seconds:.2f}s budget)"
+            failed = True
+        print(f"import {module:<22} {res['seconds'] * 1000:8.1f} ms  {status}")
+    return 1 if failed else 0
+
+# ---------------------- Page scripts ----------------------
+def rendered_pages() -> dict:
+    """{page name: HTML} for every page that embeds client-side JS."""
+    import server
+    from recorder_page import recorder_html
+    return {
+        "/capture": server.capture_page(),
+        "app.py recorder": recorder_html("auto", 2, 6, "batched", 8, 5, ["Alice", 'Bob "B"'], 10.0,
+                                         "http://localhost:8000/upload"),
+    }
+
+def cmd_pages(args):
+    import re
+    import shutil
+    import tempfile
+    node = shutil.which(args.node)
+    if node is None:
+        print(f"{args.node} not found; install Node.js to syntax-check the page scripts.")
+        return 2
+    failed = False
+    for name, html in rendered_pages().items():
+        scripts = re.findall(r"<script>(.*?)</script>", html, flags=re.S)
+        for i, js in enumerate(scripts):
+            with tempfile.NamedTemporaryFile("w", suffix=".js", delete=False) as f:
+                f.write(js)
+            out = subprocess.run([node, "--check", f.name], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 text=True)
+            Path(f.name).unlink()
+            ok = out.returncode == 0
+            failed |= not ok
+            print(f"{name:<18} script {i}  {'ok' if ok else 'FAIL'}")
+            if not ok:
+                print(out.stderr.strip())
+        if not scripts:
+            failed = True
+            print(f"{name:<18} FAIL (no <script> found)")
+    return 1 if failed else 0
+
+# ---------------------- Speaker embeddings ----------------------
+def cosine_parity(ref, other):
+    """Per-row cosine similarity of two [N, D] embedding matrices → (mean, min)."""
+    import numpy as np
+    a = ref / (np.linalg.norm(ref, axis=1, keepdims=True) + 1e-12)
+    b = other / (np.linalg.norm(other, axis=1, keepdims=True) + 1e-12)
+    cos = np.sum(a * b, axis=1)
+    return float(cos.mean()), float(cos.min())
+
+def cmd_embeddings(args):
+    import meeting_transcriber as mt
+    from thread_budget import ThreadBudget
+
+    audio, sr = mt.load_audio_mono16k(args.audio)
+    if args.seconds:
+        audio = audio[:int(args.seconds * sr)]
+    audio_s = len(audio) / sr
+    if args.threads:   # ONNX sessions size themselves from the process budget (job_threads)
+        mt.THREAD_BUDGET = ThreadBudget(args.threads)
+    budget = mt.THREAD_BUDGET
+
+    results = {}
+    for name in ["speechbrain"] + [b for b in args.backends if b != "speechbrain"]:
+        with budget.job(name) as slot:
+            # warm-up (model load / export / calibration) is not timed
+            mt.compute_embeddings(audio[:int(min(audio_s, 30.0) * sr)], sr, slot=slot, backend=name,
+                                  mode="uniform")
+            t0 = time.perf_counter()
+            windows, embs, ok = mt.compute_embeddings(audio, sr, slot=slot, backend=name, mode="uniform")
+            results[name] = (time.perf_counter() - t0, len(windows), embs)
+        if not ok:
+            print("No voiced windows in this audio; nothing to compare.")
+            return 1
+
+    ref_t, n, ref = results["speechbrain"]
+    print(f"{audio_s:.0f}s audio, {n} windows, batch {mt.EMB_BATCH}, {budget.cores} thread(s)")
+    failed = False
+    for name, (t, _, embs) in results.items():
+        mean_cos, min_cos = cosine_parity(ref, embs)
+        ok = min_cos >= args.min_cos
+        failed |= not ok
+        print(f"{name:<12} {n / t:8.1f} win/s  {ref_t / t:5.2f}x  "
+              f"cos mean {mean_cos:.4f} min {min_cos:.4f}  {'ok' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+# ---------------------- ASR ----------------------
+def cmd_asr(args):
+    import meeting_transcriber as mt
+    from thread_budget import available_cores
+
+    audio, sr = mt.load_audio_mono16k(args.audio)
+    audio_s = len(audio) / sr
+    threads = args.threads or available_cores()
+    mt.get_asr_model(args.model, cpu_threads=threads)   # load outside the timed region
+
+    runs = [("sequential", None)] + [("batched", b) for b in args.batch_sizes]
+    print(f"{args.model}, {audio_s:.0f}s audio, beam {args.beam_size}, {threads} thread(s)")
+    base = None
+    for mode, batch in runs:
+        t0 = time.perf_counter()
+        words = mt.run_asr(Path(args.audio), args.model, threads=threads, asr_mode=mode, audio=audio,
+                           batch_size=batch, beam_size=args.beam_size)
+        dt = time.perf_counter() - t0
+        base = base or dt
+        label = mode if batch is None else f"{mode} (batch {batch})"
+        print(f"{label:<22} RTF {dt / audio_s:6.3f}  {base / dt:5.2f}x  {len(words)} words")
+    return 0
+
+# ---------------------- Diarization resolution ----------------------
+def frame_error(ref, hyp, mask=None):
+    """Share of frames whose hyp label differs from ref after the best one-to-one label mapping."""
+    import numpy as np
+    from scipy.optimize import linear_sum_assignment
+    ref, hyp = np.asarray(ref), np.asarray(hyp)
+    if mask is not None:
+        ref, hyp = ref[mask], hyp[mask]
+    if not len(ref):
+        return 0.0
+    r_ids, r = np.unique(ref, return_inverse=True)
+    h_ids, h = np.unique(hyp, return_inverse=True)
+    conf = np.zeros((len(r_ids), len(h_ids)), dtype=np.int64)
+    np.add.at(conf, (r, h), 1)
+    rows, cols = linear_sum_assignment(-conf)
+    return 1.0 - conf[rows, cols].sum() / len(ref)
+
+def rttm_track(path, n_frames, step):
+    """Reference RTTM → per-frame speaker index (-1 = no speech; overlaps keep the first)."""
+    import numpy as np
+    track = np.full(n_frames, -1, dtype=int)
+    speakers = {}
+    for line in Path(path).read_text().splitlines():
+        f = line.split()
+        if len(f) < 8 or f[0] != "SPEAKER":
+            continue
+        spk = speakers.setdefault(f[7], len(speakers))
+        a = int(round(float(f[3]) / step))
+        b = min(n_frames, int(round((float(f[3]) + float(f[4])) / step)))
+        seg = track[a:b]
+        seg[seg < 0] = spk
+    return track
+
+def cmd_diarize(args):
+    import meeting_transcriber as mt
+
+    audio, sr = mt.load_audio_mono16k(args.audio)
+    if args.seconds:
+        audio = audio[:int(args.seconds * sr)]
+    audio_s = len(audio) / sr
+    mt.compute_embeddings(audio[:int(min(audio_s, 10.0) * sr)], sr, mode="uniform")   # model load, untimed
+
+    tracks, calls, times = {}, {}, {}
+    for mode in ("uniform", "adaptive"):
+        t0 = time.perf_counter()
+        windows, embs, ok = mt.compute_embeddings(audio, sr, mode=mode)
+        times[mode] = time.perf_counter() - t0
+        if not ok:
+            print("No voiced windows in this audio; nothing to compare.")
+            return 1
+        labels = mt.choose_k_and_cluster(embs, args.min_spk, args.max_spk)
+        calls[mode] = len(windows)
+        tracks[mode] = mt.speaker_track(windows, labels, audio_s)
+        print(f"{mode:<9} {len(windows):6d} ECAPA windows  {times[mode]:7.2f}s  k={len(set(labels.tolist()))}")
+
+    proxy = frame_error(tracks["uniform"], tracks["adaptive"])
+    print(f"ECAPA calls cut {calls['uniform'] / calls['adaptive']:.2f}x, "
+          f"embedding time {times['uniform'] / times['adaptive']:.2f}x")
+    print(f"DER proxy (adaptive vs uniform frames): {proxy:.4f}")
+    failed = proxy > args.max_der_change
+    if args.rttm:
+        ref = rttm_track(args.rttm, len(tracks["uniform"]), mt.TRACK_STEP)
+        speech = ref >= 0
+        der = {m: frame_error(ref, tracks[m], speech) for m in tracks}
+        print(f"Frame DER vs {Path(args.rttm).name}: uniform {der['uniform']:.4f}  adaptive {der['adaptive']:.4f}")
+        failed |= der["adaptive"] - der["uniform"] > args.max_der_change
+    print("ok" if not failed else f"FAIL (DER change over {args.max_der_change})")
+    return 1 if failed else 0
+
+# ---------------------- Auto-model calibration ----------------------
+def cmd_calibrate(args):
+    import meeting_transcriber as mt
+    from admission import RTF_TABLE
+
+    # Load models outside the timed runs: a run that loads one is not recorded.
+    mt.get_speaker_encoder()
+    for model in args.models:
+        mt.get_asr_model(model)
+        for _ in range(2):   # an ONNX backend builds during the first run (int8 calibrates on its audio)
+            loads, t0 = mt._MODEL_LOADS, time.perf_counter()
+            mt.transcribe_and_diarize(Path(args.audio), model, args.min_spk, args.max_spk, log_cb=lambda _m: None)
+            dt = time.perf_counter() - t0
+            if mt._MODEL_LOADS == loads:
+                print(f"{model:<10} {dt:7.1f}s", flush=True)
+                break
+            print(f"{model:<10} {dt:7.1f}s  (built the embedding backend; not recorded, running again)", flush=True)
+    print(f"RTF table ({RTF_TABLE.path}):")
+    for model, e in RTF_TABLE.snapshot().items():
+        print(f"  {model:<10} RTF {e['rtf']:.3f}  ({e['runs']} run(s))")
+    return 0
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Meeting transcriber benchmarks.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("imports", help="Guard cold import time of the web entry points")
+    p.add_argument("modules", nargs="*", default=["meeting_transcriber", "server"])
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--max-seconds", type=float, default=2.0)
+    p.set_defaults(func=cmd_imports)
+
+    p = sub.add_parser("pages", help="Syntax-check the JS of the rendered recorder pages")
+    p.add_argument("--node", default="node", help="Node.js binary")
+    p.set_defaults(func=cmd_pages)
+
+    p = sub.add_parser("embeddings", help="ECAPA backend throughput + parity vs SpeechBrain")
+    p.add_argument("audio", help="Speech recording to embed")
+    p.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    p.add_argument("--seconds", type=float, default=300.0, help="Use the first N seconds (0 = all)")
+    p.add_argument("--threads", type=int, default=0, help="Cores to use (default: all)")
+    p.add_argument("--min-cos", type=float, default=0.98, help="Fail below this per-window cosine")
+    p.set_defaults(func=cmd_embeddings)
+
+    p = sub.add_parser("asr", help="Real-time factor of sequential vs batched Whisper")
+    p.add_argument("audio", help="Speech recording to transcribe")
+    p.add_argument("--model", default="tiny.en")
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 16])
+    p.add_argument("--beam-size", type=int, default=5)
+    p.add_argument("--threads", type=int, default=0, help="CTranslate2 threads (default: all cores)")
+    p.set_defaults(func=cmd_asr)
+
+    p = sub.add_parser("diarize", help="ECAPA calls + DER of uniform vs adaptive embedding")
+    p.add_argument("audio", help="Multi-speaker recording")
+    p.add_argument("--rttm", default=None, help="Reference diarization (RTTM) for a true frame DER")
+    p.add_argument("--seconds", type=float, default=0.0, help="Use the first N seconds (0 = all)")
+    p.add_argument("--min-spk", type=int, default=2)
+    p.add_argument("--max-spk", type=int, default=6)
+    p.add_argument("--max-der-change", type=float, default=0.02, help="Fail above this DER change")
+    p.set_defaults(func=cmd_diarize)
+
+    p = sub.add_parser("calibrate", help="Measure per-model pipeline RTF for model=auto")
+    p.add_argument("audio", help="Representative meeting recording")
+    p.add_argument("--models", nargs="+", default=["tiny.en", "base.en", "small.en", "medium"])
+    p.add_argument("--min-spk", type=int, default=2)
+    p.add_argument("--max-spk", type=int, default=6)
+    p.set_defaults(func=cmd_calibrate)
+
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# gunicorn.conf.py
+# Production serving: one master preloads the speaker encoder, N forked workers share it.
+# Whisper is still loaded once per worker (N copies in memory).
+#
+#   gunicorn -c gunicorn.conf.py server:app
+#
+# MS_WORKERS              worker processes (default: cores // 2, at least 1)
+# MS_MAX_JOBS_PER_WORKER  recycle a worker after this many jobs (default 50, 0 = never)
+# MS_PRELOAD_ASR          comma-separated Whisper models each worker loads at boot
+import gc
+import os
+
+from thread_budget import available_cores
+
+_cores = available_cores()
+workers = int(os.environ.get("MS_WORKERS", max(1, _cores // 2)))
+
+# Set before server.py is imported so every process sees the same configuration.
+os.environ.setdefault("MS_CPU_CORES", str(max(1, _cores // workers)))   # per-worker THREAD_BUDGET
+os.environ.setdefault("MS_MAX_JOBS_PER_WORKER", "50")
+os.environ["MS_PRELOAD"] = "1"
+os.environ["MS_GUNICORN"] = "1"
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '7861')}"
+worker_class = "uvicorn_worker.UvicornWorker"   # uvicorn.workers is deprecated
+preload_app = True            # import server.py (and the models below) once, in the master
+timeout = 600                 # uvicorn workers heartbeat from the event loop; jobs run in threads
+graceful_timeout = 900        # a recycled worker finishes its in-flight jobs first
+keepalive = 75
+
+def on_starting(server):
+    """
+    Master, before the fork. With preload_app=True, gunicorn has already imported
+    server.py (in Arbiter.setup) by the time this runs. The ECAPA encoder (torch tensors)
+    is shared copy-on-write by every worker. CTranslate2 starts its worker threads when a
+    Whisper model is constructed, and those do not survive fork, so the master only
+    downloads the Whisper files and reads them into the page cache. Each worker then
+    builds its own model.
+    """
+    import meeting_transcriber as mt
+    for name in [m for m in os.environ.get("MS_PRELOAD_ASR", mt.DEFAULT_MODEL).split(",") if m and m != "auto"]:
+        mt.prefetch_asr_model(name)
+    mt.preload_models(speaker=True)
+    # Move everything allocated so far out of the GC's reach: collections would otherwise
+    # write to object headers and un-share their pages in every worker.
+    gc.freeze()
+
+def post_worker_init(worker):
+    import server
+    server.warm_worker()      # Whisper for this worker; opens /ready
@@ -5,11 +5,13 @@ Meeting Scribe (CPU-only)
 - Records (Linux/PulseAudio) system audio + mic (optional local GUI)
 - Transcribes with faster-whisper (CPU int8)
 - Diarizes with SpeechBrain ECAPA + Agglomerative clustering (cosine, silhouette K)
-- Outputs: .md, .srt, .txt in ~/MeetingTranscripts
+- Outputs: .md, .srt, .txt in ~/MeetingTranscripts, segments indexed for full-text search
 
 This module is **Streamlit/Server safe**:
 - tkinter import is optional; GUI parts only load if Tk is available.
 - Core pipeline (transcribe_and_diarize) is importable without a GUI.
+- Heavy deps (torch, speechbrain, faster_whisper, scipy, sklearn) are imported lazily
+  on first pipeline use, so importing this module is cheap and touches no files.
 - Torch threads are capped for low-memory environments.
 
 Legal: Ensure recording/transcription complies with laws where you use this.
@@ -24,18 +26,19 @@ import subprocess
 from datetime import datetime
 from pathlib import Path
 from dataclasses import dataclass
+from collections import OrderedDict
 import os
+import struct
+import time
+from array import array
 
 import numpy as np
-import soundfile as sf
-import torch
 
-from faster_whisper import WhisperModel
-from speechbrain.inference import EncoderClassifier
-from scipy.signal import medfilt
-from sklearn.cluster import AgglomerativeClustering
-from sklearn.metrics import silhouette_score
-from sklearn.preprocessing import normalize
+from thread_budget import ThreadBudget
+from admission import AUTO_MODEL, AUTO_TARGET_S, RTF_TABLE, choose_model
+import transcript_index
+from transcript_index import speaker_label
+import voiceprints
 
 # ---------- Optional GUI: make Tk safe to import in server environments ----------
 try:
@@ -54,23 +57,53 @@ OS_NAME = platform.system()  # "Linux", "Darwin", "Windows"
 DEFAULT_MODEL = os.environ.get("MS_DEFAULT_MODEL", "tiny.en")  # "tiny.en"|"base.en"|"small.en"|"medium"
 EMB_WIN = float(os.environ.get("MS_EMB_WIN", 2.0))             # seconds
 EMB_HOP = float(os.environ.get("MS_EMB_HOP", 0.5))             # seconds
+EMB_MODE = os.environ.get("MS_EMB_MODE", "uniform")            # "uniform"|"adaptive" (coarse-to-fine)
+EMB_COARSE_HOP = float(os.environ.get("MS_EMB_COARSE_HOP", 1.5))  # adaptive first pass, multiple of EMB_HOP
+EMB_CHANGE_Z = float(os.environ.get("MS_EMB_CHANGE_Z", 1.5))   # change point: distance jump > median + z·MAD
 TRACK_STEP = float(os.environ.get("MS_TRACK_STEP", 0.10))      # seconds
 SMOOTH_KERNEL = int(os.environ.get("MS_SMOOTH_KERNEL", 7))     # odd number
 MIN_HOLD_S = float(os.environ.get("MS_MIN_HOLD_S", 0.9))
 MAX_INTERJECT_S = float(os.environ.get("MS_MAX_INTR_S", 0.7))
 RMS_THRESH_DBFS = float(os.environ.get("MS_RMS_THRESH_DBFS", -48.0))
+EMB_BACKEND = os.environ.get("MS_EMB_BACKEND", "speechbrain")  # "speechbrain"|"onnx"|"onnx-int8"
+EMB_BATCH = int(os.environ.get("MS_EMB_BATCH", 16))            # windows per encoder call
+EMB_CACHE_DIR = Path(os.environ.get("MS_EMB_CACHE", Path.home() / ".cache" / "meeting_transcriber"))
 DEFAULT_MIN_SPK = int(os.environ.get("MS_MIN_SPK", 2))
 DEFAULT_MAX_SPK = int(os.environ.get("MS_MAX_SPK", 6))
-
-# Cap torch threads (important on small instances)
-try:
-    torch.set_num_threads(int(os.environ.get("MS_TORCH_THREADS", "1")))
-    torch.set_num_interop_threads(int(os.environ.get("MS_TORCH_INTEROP", "1")))
-except Exception:
-    pass
+ASR_CPU_THREADS = int(os.environ.get("MS_ASR_THREADS", 0))    # 0 = cores / ASR_CONCURRENCY
+ASR_CONCURRENCY = int(os.environ.get("MS_ASR_CONCURRENCY", 1)) # jobs expected to run at once
+ASR_NUM_WORKERS = int(os.environ.get("MS_ASR_WORKERS", 0))   # model replicas; 0 = ASR_CONCURRENCY
+ASR_CACHE_SIZE = int(os.environ.get("MS_ASR_CACHE_SIZE", 2))  # loaded Whisper models
+ASR_MODES = ("sequential", "batched")
+ASR_MODE = os.environ.get("MS_ASR_MODE", "sequential")         # batched = VAD chunks through BatchedInferencePipeline
+ASR_BATCH_SIZE = int(os.environ.get("MS_ASR_BATCH", 8))        # chunks per batched decode
+ASR_BEAM_SIZE = int(os.environ.get("MS_ASR_BEAM", 5))
+
+# Cores shared by all in-flight jobs in this process (MS_CPU_CORES=0 → all available).
+THREAD_BUDGET = ThreadBudget(int(os.environ.get("MS_CPU_CORES", 0)) or None)
 
 OUTPUT_DIR = Path.home() / "MeetingTranscripts"
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# ---------------------- Lazy heavy imports ----------------------
+_TORCH_CONFIGURED = False
+
+def _import_torch():
+    """Import torch on first use and cap its threads (important on small instances)."""
+    global _TORCH_CONFIGURED
+    import torch
+    if not _TORCH_CONFIGURED:
+        try:
+            torch.set_num_threads(int(os.environ.get("MS_TORCH_THREADS", "1")))
+            torch.set_num_interop_threads(int(os.environ.get("MS_TORCH_INTEROP", "1")))
+        except Exception:
+            pass
+        _TORCH_CONFIGURED = True
+    return torch
+
+def _set_torch_threads(torch, n: int):
+    # Process-wide setting; honour an explicit MS_TORCH_THREADS pin.
+    if "MS_TORCH_THREADS" not in os.environ and torch.get_num_threads() != n:
+        torch.set_num_threads(n)
 
 # ---------------------- Utilities ----------------------
 def run_cmd(cmd):
@@ -126,6 +159,7 @@ def start_recording(sample_rate=16000):
     Start recording system audio (monitor) + mic via FFmpeg (Linux/PulseAudio).
     """
     mon, mic = get_default_sources()
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     out = OUTPUT_DIR / f"meeting_{timestamp()}.wav"
     cmd = [
         "ffmpeg", "-hide_banner", "-loglevel", "warning",
@@ -152,11 +186,86 @@ def stop_recording(state: RecordingState, wait_timeout=5):
     state.running = False
 
 # ---------------------- Audio helpers ----------------------
+TARGET_SR = 16000
+STREAM_BLOCK = 1 << 18   # frames per block when streaming/downmixing
+
+def _wav_data_offset(path) -> int | None:
+    """Byte offset of the RIFF/WAVE `data` chunk, or None if not a plain RIFF file."""
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+            return None
+        while True:
+            hdr = f.read(8)
+            if len(hdr) < 8:
+                return None
+            cid, size = hdr[:4], struct.unpack("<I", hdr[4:])[0]
+            if cid == b"data":
+                return f.tell()
+            f.seek(size + (size & 1), 1)
+
 def load_audio_mono16k(path):
-    wav, sr = sf.read(path)
-    if wav.ndim > 1:
-        wav = np.mean(wav, axis=1)
-    return wav, sr
+    """
+    Load audio as 16 kHz mono with bounded memory. Returns (audio, sr):
+    - 16 kHz mono PCM_16 / FLOAT WAV → read-only np.memmap (int16 or float32), no copy.
+    - 16 kHz multichannel → float32, downmixed block by block.
+    - anything else → streamed through ffmpeg to a 16 kHz mono float temp WAV, then mapped.
+    Use `as_float32` on slices of the result.
+    """
+    import soundfile as sf
+    path = str(path)
+    try:
+        info = sf.info(path)
+    except Exception:
+        info = None
+
+    if info is not None and info.samplerate == TARGET_SR:
+        if info.channels == 1 and info.format == "WAV" and info.subtype in ("PCM_16", "FLOAT"):
+            offset = _wav_data_offset(path)
+            if offset is not None:
+                dtype = "<i2" if info.subtype == "PCM_16" else "<f4"
+                return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(info.frames,)), TARGET_SR
+        out = np.empty(info.frames, dtype=np.float32)
+        pos = 0
+        for blk in sf.blocks(path, blocksize=STREAM_BLOCK, dtype="float32", always_2d=True):
+            out[pos:pos + len(blk)] = blk.mean(axis=1) if blk.shape[1] > 1 else blk[:, 0]
+            pos += len(blk)
+        return out[:pos], TARGET_SR
+
+    tmp = Path(path).with_suffix(".tmp.wav")
+    subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                    "-i", path, "-ac", "1", "-ar", str(TARGET_SR),
+                    "-c:a", "pcm_f32le", str(tmp)], check=True)   # maps as float32: no conversion
+    try:
+        audio, sr = load_audio_mono16k(tmp)
+        if isinstance(audio, np.memmap) and os.name == "nt":
+            audio = np.array(audio)   # Windows can't unlink a mapped file
+        return audio, sr
+    finally:
+        try:
+            tmp.unlink()    # POSIX keeps the mapping valid after unlink
+        except Exception:
+            pass
+
+def audio_seconds(path) -> float:
+    """Duration from the file header (ffprobe for containers libsndfile can't read); 0.0 if unknown."""
+    try:
+        import soundfile as sf
+        return float(sf.info(str(path)).duration)
+    except Exception:
+        pass
+    rc, out, _ = run_cmd(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                          "-of", "default=nw=1:nk=1", str(path)])
+    try:
+        return float(out) if rc == 0 else 0.0
+    except ValueError:
+        return 0.0
+
+def as_float32(x: np.ndarray) -> np.ndarray:
+    """float32 in [-1, 1]: int16 PCM is scaled (small copy), float32 passes through as a view."""
+    if x.dtype == np.int16:
+        return x.astype(np.float32) * np.float32(1.0 / 32768.0)
+    return x if x.dtype == np.float32 else x.astype(np.float32)
 
 def seconds_to_srt(ts):
     h = int(ts // 3600); m = int((ts % 3600) // 60); s = int(ts % 60)
@@ -165,7 +274,7 @@ def seconds_to_srt(ts):
 
 def save_outputs(base_path: Path, segments):
     """
-    segments: list of dict {spk, start, end, text}
+    segments: list of dict {spk, start, end, text}; spk is a cluster number or a name
     """
     base_no_ext = base_path.parent / base_path.stem
 
@@ -173,74 +282,496 @@ def save_outputs(base_path: Path, segments):
     with md_path.open("w", encoding="utf-8") as f:
         f.write(f"# Meeting Transcript — {base_no_ext.name}\n\n")
         for seg in segments:
-            f.write(f"**SPEAKER_{seg['spk']}** [{seg['start']:.1f}–{seg['end']:.1f}]: {seg['text']}\n\n")
+            f.write(f"**{speaker_label(seg['spk'])}** [{seg['start']:.1f}–{seg['end']:.1f}]: {seg['text']}\n\n")
 
     txt_path = base_no_ext.with_suffix(".txt")
     with txt_path.open("w", encoding="utf-8") as f:
         for seg in segments:
-            f.write(f"SPEAKER_{seg['spk']} [{seg['start']:.1f}-{seg['end']:.1f}]: {seg['text']}\n")
+            f.write(f"{speaker_label(seg['spk'])} [{seg['start']:.1f}-{seg['end']:.1f}]: {seg['text']}\n")
 
     srt_path = base_no_ext.with_suffix(".srt")
     with srt_path.open("w", encoding="utf-8") as f:
         for i, seg in enumerate(segments, 1):
             f.write(f"{i}\n")
             f.write(f"{seconds_to_srt(seg['start'])} --> {seconds_to_srt(seg['end'])}\n")
-            f.write(f"SPEAKER_{seg['spk']}: {seg['text']}\n\n")
+            f.write(f"{speaker_label(seg['spk'])}: {seg['text']}\n\n")
+
+    if transcript_index.INDEX_ENABLED:
+        # Search index is a convenience: never fail a finished transcription over it.
+        try:
+            transcript_index.index_segments(base_no_ext, segments, source_mtime=txt_path.stat().st_mtime)
+        except Exception as e:
+            print(f"[index] could not index {base_no_ext.name}: {e}")
 
     return md_path, srt_path, txt_path
 
+# ---------------------- Progress events ----------------------
+# Share of overall progress covered by each pipeline stage: (start %, end %)
+STAGE_SPAN = {"load": (0, 2), "asr": (2, 75), "embeddings": (75, 95), "clustering": (95, 100)}
+
+class PipelineEvents:
+    """
+    Structured progress emitter for the pipeline. Every event is a dict with a "type":
+      {"type": "log",      "message"}
+      {"type": "stage",    "stage", "percent"}
+      {"type": "progress", "stage", "percent"}            (overall %, whole-percent steps)
+      {"type": "segment",  "start", "end", "text"}        (ASR output as it is decoded)
+      {"type": "model",    "model", "predicted_s", ...}   (model "auto": the chosen plan)
+    `on_event` receives every event; the legacy `log_cb` still receives log lines as str.
+    """
+
+    def __init__(self, on_event=None, log_cb=None):
+        self.on_event = on_event
+        self.log_cb = log_cb if (log_cb or on_event) else print
+        self.current = None
+        self._last_pct = -1
+
+    def emit(self, type_: str, **data):
+        if self.on_event:
+            self.on_event({"type": type_, **data})
+
+    def log(self, msg: str):
+        if self.log_cb:
+            self.log_cb(msg)
+        self.emit("log", message=msg)
+
+    def stage(self, name: str):
+        self.current = name
+        pct = STAGE_SPAN.get(name, (100, 100))[0]
+        self._last_pct = pct
+        self.emit("stage", stage=name, percent=pct)
+
+    def progress(self, fraction: float):
+        """`fraction` of the current stage done; mapped onto the stage's span."""
+        lo, hi = STAGE_SPAN.get(self.current, (0, 100))
+        pct = int(lo + (hi - lo) * min(1.0, max(0.0, fraction)))
+        if pct > self._last_pct:
+            self._last_pct = pct
+            self.emit("progress", stage=self.current, percent=pct)
+
+    def segment(self, start: float, end: float, text: str):
+        self.emit("segment", start=round(float(start), 2), end=round(float(end), 2), text=text)
+
+# ---------------------- Word store ----------------------
+@dataclass
+class WordStore:
+    """
+    Columnar ASR words for long transcripts: parallel NumPy arrays (start/end seconds,
+    speaker id, token id) plus an interned token table, instead of one dict per word.
+    """
+    start: np.ndarray   # float64 [N] (exact for SRT millisecond formatting)
+    end: np.ndarray     # float64 [N]
+    spk: np.ndarray     # int32 [N]
+    tok: np.ndarray     # int32 [N], index into vocab
+    vocab: list
+
+    def __len__(self):
+        return len(self.tok)
+
+    @classmethod
+    def from_dicts(cls, words):
+        b = WordStoreBuilder()
+        for w in words:
+            b.append(w["start"], w["end"], w["word"], w.get("spk", 0))
+        return b.build()
+
+    def assign_speakers(self, track: np.ndarray, step: float):
+        """Label every word with the track frame nearest its midpoint."""
+        if not len(self) or not len(track):
+            return
+        mid = 0.5 * (self.start + self.end)
+        idx = np.clip(np.rint(mid / step).astype(np.int64), 0, len(track) - 1)
+        self.spk = np.asarray(track, dtype=np.int32)[idx]
+
+class WordStoreBuilder:
+    """Accumulates words into compact typed buffers while ASR segments stream in."""
+
+    def __init__(self):
+        self._start = array("d"); self._end = array("d")
+        self._spk = array("i"); self._tok = array("i")
+        self._ids = {}; self._vocab = []
+
+    def __len__(self):
+        return len(self._tok)
+
+    def append(self, start: float, end: float, word: str, spk: int = 0):
+        word = word.strip()
+        if not word:
+            return
+        tid = self._ids.get(word)
+        if tid is None:
+            tid = self._ids[word] = len(self._vocab)
+            self._vocab.append(word)
+        self._start.append(start); self._end.append(end)
+        self._spk.append(spk); self._tok.append(tid)
+
+    def build(self) -> WordStore:
+        return WordStore(
+            start=np.frombuffer(self._start, dtype=np.float64).copy(),
+            end=np.frombuffer(self._end, dtype=np.float64).copy(),
+            spk=np.frombuffer(self._spk, dtype=np.int32).copy(),
+            tok=np.frombuffer(self._tok, dtype=np.int32).copy(),
+            vocab=self._vocab,
+        )
+
+# ---------------------- Model cache ----------------------
+# Models are loaded once per process and reused across jobs (server requests,
+# batch workers). Loading is guarded so concurrent first calls don't double-load.
+_MODEL_LOCK = threading.Lock()
+_ASR_MODELS = OrderedDict()   # (model_name, cpu_threads) -> WhisperModel, LRU order
+_SPEAKER_ENCODER = None
+# Bumped whenever a model or embedding backend is built (download, load, ONNX export,
+# calibration). A run that saw it change is not a valid RTF sample.
+_MODEL_LOADS = 0
+
+def set_asr_concurrency(jobs: int):
+    """Size ASR for `jobs` concurrent jobs (the server passes its run slots): threads per
+    job and, unless MS_ASR_WORKERS pins it, the number of model replicas."""
+    global ASR_CONCURRENCY
+    ASR_CONCURRENCY = max(1, int(jobs))
+
+def job_threads() -> int:
+    """A job's THREAD_BUDGET share when ASR_CONCURRENCY jobs run: the one thread count per
+    process for runtimes that fix theirs at load time (CTranslate2, onnxruntime sessions).
+    Sizing them by a job's current share would build another copy for every distinct share."""
+    return max(1, THREAD_BUDGET.cores // max(1, ASR_CONCURRENCY))
+
+def asr_threads() -> int:
+    return ASR_CPU_THREADS or job_threads()
+
+def asr_workers() -> int:
+    """CTranslate2 replicas per model (`inter_threads`): one per concurrent job, since calls
+    on a single replica run one after another."""
+    return ASR_NUM_WORKERS or max(1, ASR_CONCURRENCY)
+
+def get_asr_model(model_name: str, cpu_threads: int | None = None):
+    """
+    One cached model per (name, thread count); jobs use asr_threads(), so in practice one
+    per name, holding asr_workers() replicas. Only ASR_CACHE_SIZE are kept (jobs already
+    holding one are unaffected). `cpu_threads` overrides the count for benchmarks.
+    """
+    global _MODEL_LOADS
+    threads = cpu_threads or asr_threads()
+    key = (model_name, threads)
+    with _MODEL_LOCK:
+        model = _ASR_MODELS.get(key)
+        if model is None:
+            from faster_whisper import WhisperModel
+            model = WhisperModel(model_name, device="cpu", compute_type="int8",
+                                 cpu_threads=threads, num_workers=asr_workers())
+            _ASR_MODELS[key] = model
+            _MODEL_LOADS += 1
+            while len(_ASR_MODELS) > max(1, ASR_CACHE_SIZE):
+                _ASR_MODELS.popitem(last=False)
+        _ASR_MODELS.move_to_end(key)
+        return model
+
+def get_speaker_encoder():
+    global _SPEAKER_ENCODER, _MODEL_LOADS
+    with _MODEL_LOCK:
+        if _SPEAKER_ENCODER is None:
+            _import_torch()
+            from speechbrain.inference import EncoderClassifier
+            _SPEAKER_ENCODER = EncoderClassifier.from_hparams(
+                source="speechbrain/spkrec-ecapa-voxceleb",
+                run_opts={"device": "cpu"}
+            )
+            _MODEL_LOADS += 1
+        return _SPEAKER_ENCODER
+
+def prefetch_asr_model(model_name: str) -> Path:
+    """Download a Whisper model if needed and read its files into the OS page cache."""
+    from faster_whisper.utils import download_model
+    path = Path(download_model(model_name))
+    for f in path.iterdir():
+        if f.is_file():
+            with f.open("rb") as fh:
+                while fh.read(1 << 24):
+                    pass
+    return path
+
+def preload_models(asr_models=(), speaker=True):
+    """
+    Load models ahead of the first job, with the asr_threads() every job will ask for.
+    "auto" is not a model (it resolves per job), so it is skipped; list the concrete
+    models to warm.
+    """
+    if speaker:
+        get_speaker_encoder()
+    for name in asr_models:
+        if name != AUTO_MODEL:
+            get_asr_model(name)
+
+# ---------------------- Speaker embedding backends ----------------------
+# All backends share SpeechBrain's feature front-end (Fbank + sentence mean norm) and
+# differ in how the ECAPA trunk runs:
+#   speechbrain → eager fp32 torch (reference)
+#   onnx        → exported graph on onnxruntime (fp32)
+#   onnx-int8   → same graph, statically quantized to int8 (QDQ), calibrated on real windows
+# The ECAPA trunk is all Conv1d, which torch's dynamic quantization leaves untouched, hence
+# static int8 through onnxruntime. Needs the optional `onnx` + `onnxruntime` packages.
+EMB_BACKENDS = ("speechbrain", "onnx", "onnx-int8")
+_EMB_BACKENDS = {}   # name -> backend
+# Serializes backend construction (ONNX export / int8 calibration). Separate from
+# _MODEL_LOCK, which SpeechBrainEmbedder takes to fetch the encoder.
+_EMB_BUILD_LOCK = threading.Lock()
+
+class SpeechBrainEmbedder:
+    name = "speechbrain"
+
+    def __init__(self):
+        self.torch = _import_torch()
+        self.classifier = get_speaker_encoder()
+
+    def features(self, wavs: np.ndarray):
+        torch = self.torch
+        x = torch.from_numpy(np.ascontiguousarray(wavs, dtype=np.float32))
+        lens = torch.ones(x.shape[0])
+        feats = self.classifier.mods.compute_features(x)
+        return self.classifier.mods.mean_var_norm(feats, lens), lens
+
+    def encode(self, wavs: np.ndarray) -> np.ndarray:
+        """[B, T] float32 windows → [B, D] embeddings."""
+        with self.torch.no_grad():
+            feats, lens = self.features(wavs)
+            return self.classifier.mods.embedding_model(feats, lens).reshape(len(wavs), -1).cpu().numpy()
+
+class OnnxEmbedder(SpeechBrainEmbedder):
+    """
+    ECAPA trunk on onnxruntime. The export bakes in the batch size (SpeechBrain's length
+    masks are traced as constants), so batches are padded to EMB_BATCH.
+    """
+
+    def __init__(self, int8=False, threads=1, calib_wavs=None):
+        """`calib_wavs`: callable returning [N, T] windows; only called to build the int8 model."""
+        super().__init__()
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("MS_EMB_BACKEND=onnx needs `pip install onnx onnxruntime`.") from e
+        self.name = "onnx-int8" if int8 else "onnx"
+        self.batch = EMB_BATCH
+        path = self._export()
+        if int8:
+            path = self._quantize(path, calib_wavs)
+        opts = ort.SessionOptions()
+        self.threads = max(1, threads)
+        opts.intra_op_num_threads = self.threads
+        opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+
+    def _export(self) -> Path:
+        path = EMB_CACHE_DIR / f"ecapa_b{self.batch}.onnx"
+        if path.exists():
+            return path
+        torch = self.torch
+        path.parent.mkdir(parents=True, exist_ok=True)
+        dummy = np.zeros((self.batch, int(16000 * EMB_WIN)), dtype=np.float32)
+        with torch.no_grad():
+            feats, lens = self.features(dummy)
+            kwargs = dict(input_names=["feats", "lens"], output_names=["emb"],
+                          dynamic_axes={"feats": {1: "frames"}}, opset_version=17)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")   # unique per process (batch workers)
+            try:
+                torch.onnx.export(self.classifier.mods.embedding_model, (feats, lens), str(tmp),
+                                  dynamo=False, **kwargs)
+            except TypeError:   # torch < 2.5 has no `dynamo` switch
+                torch.onnx.export(self.classifier.mods.embedding_model, (feats, lens), str(tmp), **kwargs)
+        tmp.replace(path)
+        return path
+
+    def _quantize(self, fp32_path: Path, calib_wavs) -> Path:
+        path = fp32_path.with_suffix(".int8.onnx")
+        if path.exists():
+            return path
+        calib_wavs = calib_wavs() if calib_wavs is not None else None
+        if calib_wavs is None or not len(calib_wavs):
+            raise RuntimeError("onnx-int8 needs calibration windows on first use.")
+        from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                              quantize_static)
+        batches = [self._pad(calib_wavs[i:i + self.batch])[0]
+                   for i in range(0, len(calib_wavs), self.batch)]
+        feeds = []
+        with self.torch.no_grad():
+            for b in batches:
+                feats, lens = self.features(b)
+                feeds.append({"feats": feats.numpy(), "lens": lens.numpy()})
+
+        class _Reader(CalibrationDataReader):
+            def __init__(self):
+                self.it = iter(feeds)
+            def get_next(self):
+                return next(self.it, None)
+
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")   # unique per process (batch workers)
+        quantize_static(str(fp32_path), str(tmp), _Reader(), quant_format=QuantFormat.QDQ,
+                        weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8,
+                        per_channel=True)
+        tmp.replace(path)
+        return path
+
+    def _pad(self, wavs):
+        n = len(wavs)
+        if n < self.batch:   # repeat the last row rather than feed silence through the norm
+            wavs = np.concatenate([wavs, np.repeat(wavs[-1:], self.batch - n, axis=0)])
+        return wavs, n
+
+    def encode(self, wavs: np.ndarray) -> np.ndarray:
+        out = []
+        for i in range(0, len(wavs), self.batch):
+            chunk, n = self._pad(wavs[i:i + self.batch])
+            with self.torch.no_grad():
+                feats, lens = self.features(chunk)
+            emb = self.session.run(None, {"feats": feats.numpy(), "lens": lens.numpy()})[0]
+            out.append(emb.reshape(self.batch, -1)[:n])
+        return np.vstack(out)
+
+def get_embedding_backend(name: str | None = None, calib_wavs=None):
+    """
+    One backend per name. ONNX sessions fix their intra-op threads when built, so they get
+    job_threads(); the SpeechBrain backend follows torch's (rebalanced) thread setting.
+    """
+    global _MODEL_LOADS
+    name = name or EMB_BACKEND
+    if name not in EMB_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {name!r}; choose from {EMB_BACKENDS}.")
+    key = name
+    with _EMB_BUILD_LOCK:
+        backend = _EMB_BACKENDS.get(key)
+        if backend is None:
+            backend = (SpeechBrainEmbedder() if name == "speechbrain"
+                       else OnnxEmbedder(int8=(name == "onnx-int8"), threads=job_threads(), calib_wavs=calib_wavs))
+            _EMB_BACKENDS[key] = backend
+            if name != "speechbrain":   # export / calibration; the encoder load counts on its own
+                _MODEL_LOADS += 1
+    return backend
+
 # ---------------------- Embeddings & Clustering ----------------------
-def window_iter(audio, sr, win_s, hop_s):
-    n = len(audio); w = int(sr * win_s); h = int(sr * hop_s)
+def window_starts(n, sr, win_s, hop_s):
+    """Start times (s) of sliding windows over `n` samples; at least one window."""
+    w = int(sr * win_s); h = int(sr * hop_s)
     if w <= 0 or h <= 0:
-        return
-    for start in range(0, max(1, n - w + 1), h):
-        st_s = start / sr
-        en_s = (start + w) / sr
-        yield st_s, en_s, audio[start:start+w]
+        return []
+    return [start / sr for start in range(0, max(1, n - w + 1), h)]
 
 def dbfs(x: np.ndarray) -> float:
     # x expected float in [-1, 1]
     rms = np.sqrt(np.mean(np.square(x))) + 1e-12
     return 20.0 * np.log10(rms)
 
-def compute_embeddings(audio, sr, log=lambda *_: None):
+def compute_embeddings(audio, sr, log=lambda *_: None, slot=None, progress=None, backend=None, mode=None):
     """
-    Sliding ECAPA embeddings with energy gating.
+    Sliding ECAPA embeddings with energy gating, encoded EMB_BATCH windows at a time.
+    `backend` picks the encoder ("speechbrain" | "onnx" | "onnx-int8", default EMB_BACKEND).
+    `mode` ("uniform" | "adaptive", default EMB_MODE): uniform embeds every EMB_HOP;
+    adaptive embeds every EMB_COARSE_HOP, then only between coarse windows whose embeddings
+    jump (candidate speaker changes) at EMB_HOP. Both give equal-width windows sorted by start.
+    `slot` (thread_budget.JobSlot) sizes SpeechBrain's torch threads; it is re-read per batch
+    so a long job picks up cores freed by jobs that finished. ONNX backends run with the
+    thread count their session was built with (job_threads()).
+    `progress(fraction)` is called periodically with the share of audio covered.
     Returns: windows ([(st,en), ...]), embs (np.ndarray), ok (bool)
     """
-    classifier = EncoderClassifier.from_hparams(
-        source="speechbrain/spkrec-ecapa-voxceleb",
-        run_opts={"device": "cpu"}
-    )
-
-    windows, embs = [], []
-    for st, en, seg in window_iter(audio, sr, EMB_WIN, EMB_HOP):
-        if len(seg) < int(0.2*sr):
-            continue
-        if dbfs(seg) < RMS_THRESH_DBFS:
-            continue
-        xt = torch.from_numpy(seg).float().unsqueeze(0)  # [1, T]
-        with torch.no_grad():
-            rep = classifier.encode_batch(xt).squeeze().cpu().numpy()
-        embs.append(rep); windows.append((st, en))
-
-    if not embs:
+    torch = _import_torch()
+    from sklearn.preprocessing import normalize
+    adaptive = (mode or EMB_MODE) == "adaptive"
+
+    # Energy-gate first (cheap), keeping only window bounds; samples are re-sliced per
+    # batch so no more than EMB_BATCH float32 windows exist at once.
+    hop = EMB_COARSE_HOP if adaptive else EMB_HOP
+    voiced = _voiced_windows(audio, sr, window_starts(len(audio), sr, EMB_WIN, hop))
+    if not voiced:
         log("No voiced/energetic windows detected for diarization.")
         return [], np.zeros((0,)), False
 
-    embs = normalize(np.vstack(embs))  # cosine-friendly
-    return windows, embs, True
-
-def choose_k_and_cluster(embs, min_k, max_k, log=lambda *_: None):
+    def batch_wavs(bounds):
+        # windows are equal length except a clip shorter than EMB_WIN (single window)
+        return np.stack([as_float32(audio[int(round(st * sr)):int(round(en * sr))]) for st, en in bounds])
+
+    encoder = get_embedding_backend(backend, calib_wavs=lambda: batch_wavs(voiced[:4 * EMB_BATCH]))
+    fixed = getattr(encoder, "threads", None)   # ONNX: set when the session was built
+
+    total_s = max(1e-9, len(audio) / sr)
+
+    def embed(bounds, done=0.0, share=1.0):
+        out = []
+        for i in range(0, len(bounds), EMB_BATCH):
+            batch = bounds[i:i + EMB_BATCH]
+            if slot is not None:
+                _set_torch_threads(torch, slot.threads("embeddings", fixed=fixed))
+            out.append(encoder.encode(batch_wavs(batch)))
+            if progress is not None:
+                progress(done + share * min(1.0, batch[-1][1] / total_s))
+        return normalize(np.vstack(out))  # cosine-friendly
+
+    if not adaptive:
+        return voiced, embed(voiced), True
+
+    # Coarse pass over the whole meeting, then EMB_HOP windows only where speakers may change.
+    coarse = embed(voiced, share=0.7)
+    fine = _voiced_windows(audio, sr, _refine_starts(voiced, coarse, EMB_HOP))
+    log(f"Adaptive embeddings: {len(voiced)} coarse + {len(fine)} fine windows.")
+    if not fine:
+        return voiced, coarse, True
+    windows = voiced + fine
+    embs = np.vstack([coarse, embed(fine, done=0.7, share=0.3)])
+    order = sorted(range(len(windows)), key=lambda i: windows[i][0])
+    return [windows[i] for i in order], embs[order], True
+
+def _voiced_windows(audio, sr, starts):
+    """EMB_WIN windows at `starts` (seconds) that pass the energy gate → [(st, en), ...]."""
+    w = int(sr * EMB_WIN)
+    n = len(audio)
+    out = []
+    for st in starts:
+        a = int(round(st * sr))
+        seg = audio[a:a + w]
+        if len(seg) >= int(0.2*sr) and dbfs(as_float32(seg)) >= RMS_THRESH_DBFS:
+            out.append((a / sr, min(a + w, n) / sr))
+    return out
+
+def change_points(embs: np.ndarray, z: float = EMB_CHANGE_Z) -> np.ndarray:
+    """
+    Indices i where the cosine distance between consecutive embeddings i, i+1 jumps:
+    above median + z·MAD of all consecutive distances (robust to the meeting's noise level).
+    """
+    if len(embs) < 2:
+        return np.zeros(0, dtype=int)
+    d = 1.0 - np.sum(embs[:-1] * embs[1:], axis=1)
+    med = np.median(d)
+    mad = 1.4826 * np.median(np.abs(d - med))
+    return np.flatnonzero(d > med + z * max(mad, 1e-6))
+
+def _refine_starts(coarse_windows, coarse_embs, hop_s):
+    """EMB_HOP-grid window starts strictly between each coarse pair flagged by change_points."""
+    starts = set()
+    for i in change_points(coarse_embs).tolist():
+        a, b = coarse_windows[i][0], coarse_windows[i + 1][0]
+        k = int(np.floor(a / hop_s + 1e-6)) + 1
+        while k * hop_s < b - 1e-6:
+            starts.add(k)
+            k += 1
+    return [k * hop_s for k in sorted(starts)]
+
+def choose_k_and_cluster(embs, min_k, max_k, log=lambda *_: None, k=None):
     """
     Choose K by maximizing silhouette score (cosine).
     Always enforces k >= min_k (if enough samples).
+    A known `k` (e.g. from voiceprints) skips the sweep: one clustering at that K.
     """
+    from sklearn.cluster import AgglomerativeClustering
+    from sklearn.metrics import silhouette_score
     n = len(embs)
     if n < 2:
         return np.zeros(n, dtype=int)
 
+    if k is not None:
+        k = min(k, n)
+        log(f"Using k={k} (known speakers; K search skipped).")
+        if k <= 1:
+            return np.zeros(n, dtype=int)
+        return AgglomerativeClustering(n_clusters=k, metric="cosine", linkage="average").fit_predict(embs)
+
     usable_max = min(max_k, n)  # cannot exceed samples
     best_k, best_score, best_labels = None, -1.0, None
 
@@ -269,78 +800,165 @@ def choose_k_and_cluster(embs, min_k, max_k, log=lambda *_: None):
     return best_labels
 
 # ---------------------- Main pipeline ----------------------
-def transcribe_and_diarize(wav_path: Path, model_name: str, min_speakers: int, max_speakers: int, log_cb=None):
-    log = (lambda msg: log_cb(msg)) if log_cb else print
-
-    log("Loading audio...")
-    audio, sr = load_audio_mono16k(str(wav_path))
-    if sr != 16000:
-        tmp = wav_path.with_suffix(".tmp.wav")
-        subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
-                        "-i", str(wav_path), "-ac", "1", "-ar", "16000",
-                        "-c:a", "pcm_s16le", str(tmp)], check=True)
-        audio, sr = load_audio_mono16k(str(tmp))
-        try:
-            tmp.unlink()
-        except Exception:
-            pass
-
-    log(f"ASR (faster-whisper {model_name}, word timestamps, int8 CPU)...")
-    asr = WhisperModel(model_name, device="cpu", compute_type="int8")
-    segments, _ = asr.transcribe(str(wav_path),
-                                 vad_filter=True,
-                                 vad_parameters={"min_silence_duration_ms": 300},
-                                 word_timestamps=True)
-
-    words = []
+def transcribe_and_diarize(wav_path: Path, model_name: str, min_speakers: int, max_speakers: int,
+                           log_cb=None, on_event=None, asr_mode=None, batch_size=None, beam_size=None,
+                           participants=None, target_s=None):
+    """
+    Full pipeline → list of turns {spk, start, end, text}.
+    `log_cb(str)` receives log lines; `on_event(dict)` receives structured PipelineEvents
+    (stages, percent complete by audio position, ASR segments as they are decoded).
+    `asr_mode` / `batch_size` / `beam_size` override ASR_MODE / ASR_BATCH_SIZE / ASR_BEAM_SIZE.
+    `participants` (names, enrolled in voiceprints or not) fixes K to their count; turns
+    whose cluster matches an enrolled voiceprint get the name as `spk`.
+    `model_name="auto"` picks the largest model predicted to finish within `target_s`
+    (default MS_AUTO_TARGET_S) from this host's measured RTFs; the plan is sent as a
+    {"type": "model", ...} event. Every run's RTF is recorded in RTF_TABLE, except runs
+    that had to load or build a model (lazy first use): their time isn't inference.
+    """
+    events = PipelineEvents(on_event=on_event, log_cb=log_cb)
+    asr_opts = {"asr_mode": asr_mode, "batch_size": batch_size, "beam_size": beam_size}
+    audio_s = audio_seconds(wav_path)
+    if model_name == AUTO_MODEL:
+        plan = choose_model(audio_s, target_s or AUTO_TARGET_S)
+        model_name = plan["model"]
+        events.emit("model", **plan)
+        events.log(f"Auto model: {model_name} (predicted {plan['predicted_s']:.0f}s "
+                   f"for target {plan['target_s']:.0f}s{'' if plan['meets_target'] else ', target unreachable'}).")
+    with THREAD_BUDGET.job(Path(wav_path).name) as slot:
+        loads, t0 = _MODEL_LOADS, time.perf_counter()
+        turns = _run_pipeline(Path(wav_path), model_name, min_speakers, max_speakers, events, slot, asr_opts,
+                              participants=participants)
+        # Silent / failed-ASR files finish early, and a load (by this or a concurrent job)
+        # inflates the time; either would skew the estimate.
+        if turns and _MODEL_LOADS == loads:
+            RTF_TABLE.observe(model_name, audio_s, time.perf_counter() - t0)
+        return turns
+
+def run_asr(wav_path: Path, model_name: str, threads: int = 0, audio_s: float = 0.0, events=None,
+            asr_mode=None, batch_size=None, beam_size=None, audio=None) -> WordStore:
+    """
+    faster-whisper with word timestamps → WordStore (absolute times).
+    `audio` is the file as returned by load_audio_mono16k; faster-whisper takes it as is
+    (a float32 memmap is not copied) instead of decoding the whole file into a new array.
+    sequential: WhisperModel.transcribe over the whole file.
+    batched:    VAD-split speech chunks decoded `batch_size` at a time by
+                BatchedInferencePipeline, which restores chunk-relative segment and
+                word times to absolute file positions.
+    """
+    events = events or PipelineEvents(log_cb=lambda _m: None)
+    mode = asr_mode or ASR_MODE
+    if mode not in ASR_MODES:
+        raise ValueError(f"Unknown ASR mode {mode!r}; choose from {ASR_MODES}.")
+    beam = int(beam_size or ASR_BEAM_SIZE)
+    batch = int(batch_size or ASR_BATCH_SIZE)
+
+    asr = get_asr_model(model_name, cpu_threads=threads)
+    source = str(wav_path) if audio is None else as_float32(audio)
+    opts = dict(vad_filter=True, vad_parameters={"min_silence_duration_ms": 300},
+                word_timestamps=True, beam_size=beam)
+    if mode == "batched":
+        from faster_whisper import BatchedInferencePipeline
+        segments, _ = BatchedInferencePipeline(model=asr).transcribe(source, batch_size=batch, **opts)
+    else:
+        segments, _ = asr.transcribe(source, **opts)
+
+    # `segments` is a lazy generator: decoding happens as we iterate, so each
+    # segment is streamed out as soon as it exists.
+    builder = WordStoreBuilder()
     for seg in segments:
+        events.segment(seg.start, seg.end, seg.text.strip())
+        if audio_s:
+            events.progress(seg.end / audio_s)
         if seg.words:
             for w in seg.words:
                 if w.word:
-                    words.append({"start": float(w.start), "end": float(w.end), "word": w.word.strip()})
+                    builder.append(w.start, w.end, w.word)
         else:
-            words.append({"start": float(seg.start), "end": float(seg.end), "word": seg.text.strip()})
+            builder.append(seg.start, seg.end, seg.text)
+    return builder.build()
 
-    if not words:
+def _run_pipeline(wav_path: Path, model_name: str, min_speakers: int, max_speakers: int, events, slot,
+                  asr_opts=None, participants=None):
+    log = events.log
+    asr_opts = {k: v for k, v in (asr_opts or {}).items() if v}
+
+    events.stage("load")
+    log("Loading audio...")
+    audio, sr = load_audio_mono16k(wav_path)
+    total_s = max(1e-9, len(audio) / sr)
+
+    events.stage("asr")
+    threads = slot.threads("asr", fixed=asr_threads())
+    mode = asr_opts.get("asr_mode", ASR_MODE)
+    log(f"ASR (faster-whisper {model_name}, {mode}, word timestamps, int8 CPU, {threads} threads)...")
+    words = run_asr(wav_path, model_name, threads=threads, audio_s=total_s, events=events, audio=audio,
+                    **asr_opts)
+
+    if not len(words):
         log("No words from ASR; returning empty transcript.")
         return []
 
+    events.stage("embeddings")
     log("Computing sliding-window embeddings...")
-    win_list, embs, ok = compute_embeddings(audio, sr, log=log)
+    win_list, embs, ok = compute_embeddings(audio, sr, log=log, slot=slot, progress=events.progress)
     if not ok or len(win_list) == 0:
         log("Diarization unavailable; using single-speaker transcript.")
         return merge_words_into_turns(words)
 
-    log("Clustering embeddings (auto-K with silhouette)...")
-    labels = choose_k_and_cluster(embs, min_speakers, max_speakers, log=log)
+    events.stage("clustering")
+    slot.threads("clustering")
+    store = voiceprints.get_store()
+    known_k = None
+    if participants:
+        known_k = len(participants)
+    elif len(store):
+        present, coverage = store.detect(embs, voiceprints.VOICE_MATCH)
+        if present:
+            log(f"Voiceprints: {', '.join(present)} ({coverage:.0%} of windows).")
+        if present and coverage >= voiceprints.VOICE_COVERAGE:
+            known_k = int(np.clip(len(present), min_speakers, max_speakers))
+        elif present:
+            min_speakers = max(min_speakers, min(len(present), max_speakers))
+    if known_k is None:
+        log("Clustering embeddings (auto-K with silhouette)...")
+    labels = choose_k_and_cluster(embs, min_speakers, max_speakers, log=log, k=known_k)
+    names = store.match(voiceprints.cluster_centroids(embs, labels), voiceprints.VOICE_MATCH,
+                        candidates=participants) if len(store) else {}
+    if names:
+        log("Matched speakers: " + ", ".join(f"{speaker_label(k)} → {v}" for k, v in sorted(names.items())))
+
+    # Dense speaker track over time (smoothed, min-hold enforced)
+    dur = max(float(words.end[-1]), len(audio)/sr)
+    final_track = speaker_track(win_list, labels, dur)
+
+    # Assign per-word speakers from final track
+    words.assign_speakers(final_track, TRACK_STEP)
 
-    # Build dense speaker track over time, smooth, and enforce min-hold
-    dur = max(words[-1]["end"], len(audio)/sr)
+    # Merge into turns (only break when speaker changes); enrolled speakers by name
+    turns = merge_words_into_turns(words)
+    for t in turns:
+        t["spk"] = names.get(t["spk"], t["spk"])
+    return turns
+
+def speaker_track(win_list, labels, dur):
+    """
+    Window labels → one speaker label per TRACK_STEP frame over [0, dur]: nearest window,
+    median-smoothed, then runs shorter than MIN_HOLD_S merged into their neighbours
+    (interjections up to MAX_INTERJECT_S are kept).
+    """
+    from scipy.signal import medfilt
     t_grid = np.arange(0.0, dur + 1e-9, TRACK_STEP)
 
-    def label_for_t(t):
-        # choose window whose center is closest, preferring those that cover t
-        best, best_idx = -1e9, -1
-        for i, (st, en) in enumerate(win_list):
-            c = 0.5 * (st + en)
-            score = -abs(c - t) + (2.0 if st <= t <= en else 0.0)
-            if score > best:
-                best, best_idx = score, i
-        return int(labels[best_idx]) if (best_idx != -1 and len(labels)) else 0
-
-    raw_track = np.array([label_for_t(t) for t in t_grid], dtype=int)
+    raw_track = nearest_window_labels(win_list, labels, t_grid)
     smooth_track = medfilt(raw_track, kernel_size=SMOOTH_KERNEL if SMOOTH_KERNEL % 2 else SMOOTH_KERNEL + 1)
 
     min_hold_frames = max(1, int(round(MIN_HOLD_S / TRACK_STEP)))
     max_intr_frames = max(1, int(round(MAX_INTERJECT_S / TRACK_STEP)))
 
-    # compress runs
-    runs = []
-    s_idx = 0
-    for i in range(1, len(smooth_track) + 1):
-        if i == len(smooth_track) or smooth_track[i] != smooth_track[i - 1]:
-            runs.append([smooth_track[s_idx], s_idx, i - 1])  # [label, start_frame, end_frame]
-            s_idx = i
+    # compress runs: [label, start_frame, end_frame]
+    run_starts = np.r_[0, np.flatnonzero(np.diff(smooth_track)) + 1]
+    run_ends = np.r_[run_starts[1:] - 1, len(smooth_track) - 1]
+    runs = [[smooth_track[s], s, e] for s, e in zip(run_starts.tolist(), run_ends.tolist())]
 
     # merge runs shorter than MIN_HOLD unless they are small interjections
     i = 0
@@ -361,38 +979,59 @@ def transcribe_and_diarize(wav_path: Path, model_name: str, min_speakers: int, m
     final_track = np.zeros_like(smooth_track)
     for lab, s, e in runs:
         final_track[s:e + 1] = lab
+    return final_track
 
-    def label_from_track(t):
-        idx = int(round(t / TRACK_STEP))
-        idx = max(0, min(len(final_track) - 1, idx))
-        return int(final_track[idx])
-
-    # Assign per-word speakers from final track
-    for w in words:
-        mid = 0.5 * (w["start"] + w["end"])
-        w["spk"] = label_from_track(mid)
-
-    # Merge into turns (only break when speaker changes)
-    return merge_words_into_turns(words)
+def nearest_window_labels(win_list, labels, t_grid):
+    """
+    Label of the window whose centre is closest to each t (ties → earlier window).
+    All windows share one width, so the closest centre is also a covering window
+    whenever one exists.
+    """
+    if not len(win_list) or not len(labels):
+        return np.zeros(len(t_grid), dtype=int)
+    centers = np.asarray([0.5 * (st + en) for st, en in win_list])
+    order = np.argsort(centers, kind="stable")
+    centers = centers[order]
+    labels = np.asarray(labels)[order]
+    right = np.clip(np.searchsorted(centers, t_grid, side="left"), 0, len(centers) - 1)
+    left = np.clip(right - 1, 0, len(centers) - 1)
+    pick = np.where(np.abs(t_grid - centers[left]) <= np.abs(centers[right] - t_grid), left, right)
+    return labels[pick].astype(int)
 
 def merge_words_into_turns(words):
-    segments_out = []
-    cur = None
-    for w in words:
-        spk = w.get("spk", 0)
-        if cur is None:
-            cur = {"spk": spk, "start": w["start"], "end": w["end"], "text": w["word"]}
-            continue
-        if spk == cur["spk"]:
-            joiner = "" if (w["word"].startswith("'") or cur["text"].endswith("'")) else " "
-            cur["end"] = w["end"]
-            cur["text"] += joiner + w["word"]
-        else:
-            segments_out.append(cur)
-            cur = {"spk": spk, "start": w["start"], "end": w["end"], "text": w["word"]}
-    if cur:
-        segments_out.append(cur)
-    return segments_out
+    """
+    Collapse consecutive same-speaker words into turns {spk, start, end, text}.
+    Turn boundaries and joiners are computed on the arrays; each turn's text is
+    joined once.
+    """
+    if not isinstance(words, WordStore):
+        words = WordStore.from_dicts(words)
+    n = len(words)
+    if not n:
+        return []
+
+    vocab = np.asarray(words.vocab, dtype=object)
+    lead_apos = np.fromiter((t.startswith("'") for t in words.vocab), dtype=bool, count=len(vocab))
+    trail_apos = np.fromiter((t.endswith("'") for t in words.vocab), dtype=bool, count=len(vocab))
+
+    bounds = np.flatnonzero(words.spk[1:] != words.spk[:-1]) + 1
+    starts = np.r_[0, bounds]
+    ends = np.r_[bounds, n]
+
+    # no space before a word that starts with, or follows a word ending in, an apostrophe
+    no_space = np.zeros(n, dtype=bool)
+    no_space[1:] = lead_apos[words.tok[1:]] | trail_apos[words.tok[:-1]]
+    no_space[starts] = True
+    tokens = vocab[words.tok]
+    pieces = np.where(no_space, tokens, " " + tokens)
+
+    spk = words.spk[starts].tolist()
+    t0 = words.start[starts].tolist()
+    t1 = words.end[ends - 1].tolist()
+    return [
+        {"spk": spk[i], "start": t0[i], "end": t1[i], "text": "".join(pieces[s:e])}
+        for i, (s, e) in enumerate(zip(starts.tolist(), ends.tolist()))
+    ]
 
 # ---------------------- Optional Tk GUI ----------------------
 if GUI_AVAILABLE:
@@ -407,6 +1046,7 @@ if GUI_AVAILABLE:
             self.model_var = tk.StringVar(value=DEFAULT_MODEL)
             self.min_spk_var = tk.IntVar(value=DEFAULT_MIN_SPK)
             self.max_spk_var = tk.IntVar(value=DEFAULT_MAX_SPK)
+            self.target_min_var = tk.IntVar(value=max(1, int(AUTO_TARGET_S // 60)))
 
             frm = ttk.Frame(root, padding=12)
             frm.pack(fill=tk.BOTH, expand=True)
@@ -414,7 +1054,7 @@ if GUI_AVAILABLE:
             # Model
             ttk.Label(frm, text="Whisper model (CPU):").grid(row=0, column=0, sticky="w")
             self.model_dd = ttk.Combobox(frm, textvariable=self.model_var,
-                                         values=["tiny.en", "base.en", "small.en", "medium"],
+                                         values=["tiny.en", "base.en", "small.en", "medium", AUTO_MODEL],
                                          state="readonly", width=12)
             self.model_dd.grid(row=0, column=1, sticky="w", padx=(8, 16))
 
@@ -434,6 +1074,12 @@ if GUI_AVAILABLE:
             self.start_btn.grid(row=1, column=0, pady=10, sticky="w")
             self.stop_btn.grid(row=1, column=1, pady=10, sticky="w")
 
+            # Turnaround target for the "auto" model
+            ttk.Label(frm, text="Auto target (min):").grid(row=1, column=2, sticky="e")
+            self.target_dd = ttk.Combobox(frm, textvariable=self.target_min_var,
+                                          values=[2, 5, 10, 15, 30, 60], state="readonly", width=4)
+            self.target_dd.grid(row=1, column=3, sticky="w", padx=(6, 16))
+
             self.status_var = tk.StringVar(value="Ready.")
             ttk.Label(frm, textvariable=self.status_var).grid(row=2, column=0, columnspan=6, sticky="w")
 
@@ -481,17 +1127,19 @@ if GUI_AVAILABLE:
             wav_path = self.state.wav_path
             self.status_var.set("Transcribing + diarizing (CPU)...")
 
-            args = (wav_path, self.model_var.get(), int(self.min_spk_var.get()), int(self.max_spk_var.get()))
+            args = (wav_path, self.model_var.get(), int(self.min_spk_var.get()), int(self.max_spk_var.get()),
+                    60.0 * int(self.target_min_var.get()))
             self.worker = threading.Thread(target=self._process_file, args=args, daemon=True)
             self.worker.start()
 
-        def _process_file(self, wav_path: Path, model_name: str, min_spk: int, max_spk: int):
+        def _process_file(self, wav_path: Path, model_name: str, min_spk: int, max_spk: int, target_s: float):
             try:
                 def cb(m): self.log(m)
                 # ensure min <= max
                 min_spk = max(1, min(min_spk, max_spk))
                 max_spk = max(min_spk, max_spk)
-                segments_out = transcribe_and_diarize(wav_path, model_name, min_spk, max_spk, log_cb=cb)
+                segments_out = transcribe_and_diarize(wav_path, model_name, min_spk, max_spk, log_cb=cb,
+                                                      target_s=target_s)
                 md, srt, txt = save_outputs(wav_path, segments_out)
                 self.log(f"Saved:\n- {md}\n- {srt}\n- {txt}")
                 self.status_var.set("Done. Files saved in ~/MeetingTranscripts")
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Browser recorder component embedded by app.py (tab capture + mic → /upload, progress
+over SSE). Kept free of Streamlit so `benchmark.py pages` can render it and syntax-check
+the script.
+"""
+
+import json
+
+def recorder_html(model_choice, min_speakers, max_speakers, asr_mode, batch_size, beam_size,
+                  participants, target_min, endpoint) -> str:
+    return f"""
+<div style="display:flex; gap:8px; align-items:center; margin: 8px 0 4px 0;">
+  <button id="start" style="padding:8px 12px;">Start</button>
+  <button id="stop" style="padding:8px 12px;" disabled>Stop</button>
+</div>
+<div style="margin:4px 0;"><progress id="bar" max="100" value="0" style="width:70%;"></progress> <span id="stage" style="font-family:monospace;"></span></div>
+<pre id="status" style="font-family:monospace; white-space:pre-wrap; background:#0f1117; color:#e6edf3; padding:10px; border-radius:6px; min-height:120px;"></pre>
+<pre id="transcript" style="font-family:monospace; white-space:pre-wrap; max-height:260px; overflow-y:auto;"></pre>
+
+<script>
+const statusEl = document.getElementById('status');
+let mediaRecorder;
+let recordedChunks = [];
+let mixedStream;
+let ctx, dest, tabStream, micStream;
+
+const MODEL = {repr(model_choice)};
+const MIN_SPK = {int(min_speakers)};
+const MAX_SPK = {int(max_speakers)};
+const ASR_MODE = {repr(asr_mode)};
+const BATCH = {int(batch_size)};
+const BEAM = {int(beam_size)};
+const PEOPLE = {json.dumps(",".join(participants))};
+const TARGET_S = {float(target_min) * 60};
+const ENDPOINT = {repr(endpoint)};
+
+function log(m) {{ statusEl.textContent += (statusEl.textContent ? "\\n" : "") + m; }}
+
+async function wakeApi() {{
+  try {{
+    const base = ENDPOINT.replace(/\\/upload$/, "");
+    await fetch(base + "/health", {{ method: "GET", cache: "no-store" }});
+    log("API is awake.");
+  }} catch (e) {{
+    log("Could not wake API: " + e);
+  }}
+}}
+
+async function startCapture() {{
+  try {{
+    await wakeApi();  // wake before recording/upload
+    const tab = await navigator.mediaDevices.getDisplayMedia({{ video: true, audio: true }});
+    const mic = await navigator.mediaDevices.getUserMedia({{ audio: true }});
+
+    ctx = new (window.AudioContext || window.webkitAudioContext)();
+    dest = ctx.createMediaStreamDestination();
+    const tabSrc = ctx.createMediaStreamSource(tab);
+    const micSrc = ctx.createMediaStreamSource(mic);
+
+    const tabGain = ctx.createGain(); tabGain.gain.value = 1.0;
+    const micGain = ctx.createGain(); micGain.gain.value = 1.0;
+    tabSrc.connect(tabGain).connect(dest);
+    micSrc.connect(micGain).connect(dest);
+
+    recordedChunks = [];
+    tabStream = tab; micStream = mic; mixedStream = dest.stream;
+
+    // Lower bitrate for smaller, faster uploads (~48 kbps)
+    const opts = {{ mimeType: 'audio/webm;codecs=opus', audioBitsPerSecond: 48000 }};
+    mediaRecorder = new MediaRecorder(mixedStream, opts);
+    mediaRecorder.ondataavailable = (e) => {{ if (e.data && e.data.size > 0) recordedChunks.push(e.data); }};
+    mediaRecorder.onstop = onStop;
+
+    mediaRecorder.start(1000); // gather chunks every second
+    document.getElementById('start').disabled = true;
+    document.getElementById('stop').disabled = false;
+
+    statusEl.textContent = "";
+    log("Recording… (selected tab + mic)");
+    log("Tip: Keep the same tab focused to ensure tab audio stays shared.");
+  }} catch (e) {{
+    log("Failed to start capture: " + e);
+  }}
+}}
+
+// Parse a text/event-stream response body and call onEvent(obj) per `data:` frame
+async function readEvents(resp, onEvent) {{
+  const reader = resp.body.getReader();
+  const dec = new TextDecoder();
+  let buf = "";
+  while (true) {{
+    const {{ value, done }} = await reader.read();
+    if (done) break;
+    buf += dec.decode(value, {{ stream: true }});
+    let i;
+    while ((i = buf.indexOf("\\n\\n")) >= 0) {{
+      const frame = buf.slice(0, i); buf = buf.slice(i + 2);
+      const data = frame.split("\\n").filter(l => l.startsWith("data:")).map(l => l.slice(5).trim()).join("\\n");
+      if (data) onEvent(JSON.parse(data));
+    }}
+  }}
+}}
+
+function fmt(t) {{ const m = Math.floor(t / 60), s = (t % 60).toFixed(1).padStart(4, "0"); return m + ":" + s; }}
+
+function onEvent(ev) {{
+  if (ev.type === "stage" || ev.type === "progress") {{
+    document.getElementById('bar').value = ev.percent;
+    document.getElementById('stage').textContent = ev.stage + " " + ev.percent + "%";
+  }} else if (ev.type === "segment") {{
+    const tr = document.getElementById('transcript');
+    tr.textContent += "[" + fmt(ev.start) + "–" + fmt(ev.end) + "] " + ev.text + "\\n";
+    tr.scrollTop = tr.scrollHeight;
+  }} else if (ev.type === "model") {{
+    log("Model: " + ev.model + (ev.fallback_from ? " (fell back from " + ev.fallback_from + ")" : "") +
+        ", predicted " + Math.round(ev.predicted_s) + "s for a " + Math.round(ev.target_s) + "s target");
+  }} else if (ev.type === "queued") {{
+    document.getElementById('stage').textContent = "queued #" + ev.position + " (~" + Math.round(ev.eta_s) + "s)";
+  }} else if (ev.type === "log") {{
+    log(ev.message);
+  }} else if (ev.type === "done") {{
+    document.getElementById('bar').value = 100;
+    document.getElementById('stage').textContent = "done";
+    log("Server finished. Saved files (links):");
+    log(JSON.stringify(ev.saved, null, 2));
+  }} else if (ev.type === "error") {{
+    log("Server error: " + ev.error);
+  }}
+}}
+
+async function onStop() {{
+  log("Finalizing recording…");
+  try {{
+    const blob = new Blob(recordedChunks, {{ type: 'audio/webm' }});
+    const file = new File([blob], "browser_capture.webm", {{ type: 'audio/webm' }});
+
+    const form = new FormData();
+    form.append('file', file);
+    form.append('model', MODEL);
+    form.append('min_spk', String(MIN_SPK));
+    form.append('max_spk', String(MAX_SPK));
+    form.append('asr_mode', ASR_MODE);
+    form.append('batch_size', String(BATCH));
+    form.append('beam_size', String(BEAM));
+    if (PEOPLE) form.append('participants', PEOPLE);
+    if (MODEL === "auto") form.append('target_s', String(TARGET_S));
+    form.append('stream', 'true');
+
+    document.getElementById('transcript').textContent = "";
+    log("Uploading to: " + ENDPOINT);
+    const resp = await fetch(ENDPOINT, {{ method: 'POST', body: form }});
+    if (resp.status === 429) {{
+      const body = await resp.json();   // Retry-After header is not CORS-exposed; the body carries it
+      log("Server busy (" + body.reason + "), try again in " + body.retry_after + "s.");
+      return;
+    }}
+    if (!resp.ok) {{
+      log("Server returned an error response (HTTP " + resp.status + ").");
+      return;
+    }}
+    await readEvents(resp, onEvent);
+  }} catch (e) {{
+    log("Upload failed: " + e);
+  }} finally {{
+    try {{ tabStream?.getTracks().forEach(t => t.stop()); micStream?.getTracks().forEach(t => t.stop()); }} catch (_e) {{}}
+    document.getElementById('start').disabled = false;
+    document.getElementById('stop').disabled = true;
+  }}
+}}
+
+document.getElementById('start').onclick = startCapture;
+document.getElementById('stop').onclick = () => {{
+  if (mediaRecorder && mediaRecorder.state !== 'inactive') {{
+    mediaRecorder.stop();
+    log("Stopping recorder…");
+  }}
+}};
+</script>
+        """
@@ -1,17 +1,27 @@
 # server.py
 from fastapi import FastAPI, UploadFile, File, Form, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
 from datetime import datetime
 import subprocess
+import threading
+import queue
+import json
+import signal
+import time
+import uuid
 import os
 
 from meeting_transcriber import (
-    transcribe_and_diarize, save_outputs,
-    DEFAULT_MODEL, DEFAULT_MIN_SPK, DEFAULT_MAX_SPK
+    transcribe_and_diarize, save_outputs, preload_models, set_asr_concurrency, audio_seconds,
+    DEFAULT_MODEL, DEFAULT_MIN_SPK, DEFAULT_MAX_SPK, THREAD_BUDGET,
+    ASR_MODES, ASR_MODE, ASR_BATCH_SIZE, ASR_BEAM_SIZE,
 )
+from admission import AdmissionController, Rejected
+import transcript_index
 # server.py (add import near the top)
 from fastapi.responses import HTMLResponse
 
@@ -19,13 +29,107 @@ from fastapi.responses import HTMLResponse
 UPLOAD_DIR = Path.home() / "MeetingTranscripts"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# ---------------------- Serving mode ----------------
+# MS_PRELOAD=1: load models before taking jobs (/ready answers 503 until then).
+# Under gunicorn (gunicorn.conf.py) the master preloads the speaker encoder and forks
+# workers that share it copy-on-write; each worker loads Whisper in post_worker_init.
+PRELOAD = os.environ.get("MS_PRELOAD", "0") == "1"
+PRELOAD_ASR_MODELS = [m for m in os.environ.get("MS_PRELOAD_ASR", DEFAULT_MODEL).split(",") if m]
+# Recycle a gunicorn worker after this many jobs to bound memory growth (0 = never).
+MAX_JOBS_PER_WORKER = int(os.environ.get("MS_MAX_JOBS_PER_WORKER", 0))
+UNDER_GUNICORN = os.environ.get("MS_GUNICORN", "0") == "1"
+
+MODELS_READY = threading.Event()
+if not PRELOAD:
+    MODELS_READY.set()   # lazy mode: models load on first job
+_jobs_done = 0
+_jobs_lock = threading.Lock()
+
+def warm_worker():
+    """Load this process's models (idempotent) and open the readiness gate."""
+    preload_models(PRELOAD_ASR_MODELS)
+    MODELS_READY.set()
+
+def _job_finished():
+    global _jobs_done
+    with _jobs_lock:
+        _jobs_done += 1
+        recycle = UNDER_GUNICORN and MAX_JOBS_PER_WORKER and _jobs_done >= MAX_JOBS_PER_WORKER
+    if recycle:
+        # Graceful: the worker drains in-flight requests, the master forks a fresh one
+        # from its preloaded image.
+        MODELS_READY.clear()
+        os.kill(os.getpid(), signal.SIGTERM)
+
+# ---------------------- Admission ------------------
+# Bounded run slots + FIFO queue per process; requests beyond capacity get 429 + Retry-After.
+ADMISSION = AdmissionController(
+    max_running=int(os.environ.get("MS_MAX_RUNNING", 0)) or max(1, THREAD_BUDGET.cores // 2),
+    max_queued=int(os.environ.get("MS_MAX_QUEUED", 8)),
+    max_wait_s=float(os.environ.get("MS_MAX_QUEUE_WAIT_S", 900)),
+    per_client=int(os.environ.get("MS_MAX_PER_CLIENT", 2)),
+)
+set_asr_concurrency(ADMISSION.max_running)   # one Whisper copy per model, sized for a full house
+# Reverse proxies in front of the server that append to X-Forwarded-For (0 = use the peer address).
+TRUSTED_PROXIES = int(os.environ.get("MS_TRUSTED_PROXIES", 1))
+
+def _client_id(request: Request) -> str:
+    # Each trusted proxy (Render's edge by default) appends the address it saw, so the
+    # client is TRUSTED_PROXIES hops from the right; anything further left is caller-supplied.
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    if TRUSTED_PROXIES and len(hops) >= TRUSTED_PROXIES:
+        return hops[-TRUSTED_PROXIES]
+    return request.client.host if request.client else "unknown"
+
+def _too_busy(e: Rejected) -> JSONResponse:
+    return JSONResponse({"ok": False, "error": "server busy", "reason": e.reason, "retry_after": e.retry_after},
+                        status_code=429, headers={"Retry-After": str(e.retry_after)})
+
 # ---------------------- App ------------------------
 app = FastAPI()
 
+@app.on_event("startup")
+def _start_preload():
+    if PRELOAD and not MODELS_READY.is_set() and not UNDER_GUNICORN:
+        threading.Thread(target=warm_worker, daemon=True).start()
+
 @app.get("/health")
 def health():
     return {"ok": True}
 
+@app.get("/ready")
+def ready():
+    if not MODELS_READY.is_set():
+        return JSONResponse({"ready": False}, status_code=503, headers={"Retry-After": "5"})
+    return {"ready": True, "pid": os.getpid(), "jobs_done": _jobs_done}
+
+@app.get("/stats")
+def stats():
+    # CPU thread allocation across in-flight jobs; admission queue, waits and rejections
+    return {"threads": THREAD_BUDGET.snapshot(), "admission": ADMISSION.snapshot()}
+
+@app.get("/search")
+def search(request: Request, q: str, limit: int = 20, offset: int = 0,
+           speaker: str | None = None, meeting: str | None = None):
+    """Full-text search over indexed transcripts. Each hit carries deep links: the audio at the
+    segment's start (media fragment `#t=`) and the transcript files, when served from /files."""
+    t0 = time.perf_counter()
+    hits = transcript_index.search(q, limit=max(1, min(limit, 200)), offset=max(0, offset),
+                                   speaker=speaker, meeting=meeting)
+    base = str(request.base_url).rstrip("/")
+    for h in hits:
+        h["links"] = _deep_links(base, Path(h.pop("base")), h["start"])
+    return {"query": q, "took_ms": round((time.perf_counter() - t0) * 1000, 2), "results": hits}
+
+def _deep_links(base_url: str, base: Path, start: float) -> dict:
+    if base.parent != UPLOAD_DIR.resolve():
+        return {}   # indexed from elsewhere (e.g. batch_transcribe); not served
+    links = {ext: f"{base_url}/files/{base.name}.{ext}" for ext in ("md", "srt", "txt")}
+    audio = next((p for p in (base.with_suffix(".wav"), base.with_suffix(".webm")) if p.exists()), None)
+    if audio:
+        links["audio"] = f"{base_url}/files/{audio.name}#t={start:.1f}"
+    return links
+
 # Expose transcripts for direct download at /files/<filename>
 app.mount("/files", StaticFiles(directory=str(UPLOAD_DIR)), name="files")
 
@@ -57,7 +161,9 @@ def capture_page():
     <button id="start">Start</button>
     <button id="stop" disabled>Stop</button>
   </div>
+  <div style="margin:8px 0"><progress id="bar" max="100" value="0" style="width:70%"></progress> <span id="stage"></span></div>
   <pre id="status"></pre>
+  <pre id="transcript"></pre>
 
 <script>
 const statusEl = document.getElementById('status');
@@ -66,11 +172,16 @@ let recordedChunks = [];
 let mixedStream;
 let ctx, dest, tabStream, micStream;
 
-// Read options from query string (?model=base.en&min=2&max=6)
+// Read options from query string (?model=auto&target=10&min=2&max=6&mode=batched&batch=8&beam=5&people=Ann,Bo)
 const q = new URLSearchParams(location.search);
 const MODEL   = q.get("model") || "tiny.en";
 const MIN_SPK = parseInt(q.get("min") || "2");
 const MAX_SPK = parseInt(q.get("max") || "6");
+const ASR_MODE = q.get("mode");
+const BATCH    = q.get("batch");
+const BEAM     = q.get("beam");
+const PEOPLE   = q.get("people");
+const TARGET_MIN = q.get("target");   // model=auto: turnaround target in minutes
 // Use same-origin /upload so no CORS
 const ENDPOINT = window.location.origin + "/upload";
 
@@ -102,9 +213,9 @@ async function startCapture(){
     tabStream = tab; micStream = mic; mixedStream = dest.stream;
 
     // Lower bitrate for faster uploads (~48 kbps)
-    const opts = {{ mimeType: 'audio/webm;codecs=opus', audioBitsPerSecond: 48000 }};
+    const opts = { mimeType: 'audio/webm;codecs=opus', audioBitsPerSecond: 48000 };
     mediaRecorder = new MediaRecorder(mixedStream, opts);
-    mediaRecorder.ondataavailable = (e)=>{{ if(e.data && e.data.size>0) recordedChunks.push(e.data); }};
+    mediaRecorder.ondataavailable = (e)=>{ if(e.data && e.data.size>0) recordedChunks.push(e.data); };
     mediaRecorder.onstop = onStop;
     mediaRecorder.start(1000);
 
@@ -117,42 +228,100 @@ async function startCapture(){
   }
 }
 
+// Parse a text/event-stream response body and call onEvent(obj) per `data:` frame
+async function readEvents(resp, onEvent){
+  const reader = resp.body.getReader();
+  const dec = new TextDecoder();
+  let buf = "";
+  while (true){
+    const {value, done} = await reader.read();
+    if (done) break;
+    buf += dec.decode(value, {stream:true});
+    let i;
+    while ((i = buf.indexOf("\\n\\n")) >= 0){
+      const frame = buf.slice(0, i); buf = buf.slice(i + 2);
+      const data = frame.split("\\n").filter(l => l.startsWith("data:")).map(l => l.slice(5).trim()).join("\\n");
+      if (data) onEvent(JSON.parse(data));
+    }
+  }
+}
+
+function fmt(t){ const m = Math.floor(t/60), s = (t%60).toFixed(1).padStart(4, "0"); return m + ":" + s; }
+
+function onEvent(ev){
+  if (ev.type === "stage" || ev.type === "progress"){
+    document.getElementById('bar').value = ev.percent;
+    document.getElementById('stage').textContent = ev.stage + " " + ev.percent + "%";
+  } else if (ev.type === "segment"){
+    document.getElementById('transcript').textContent += "[" + fmt(ev.start) + "–" + fmt(ev.end) + "] " + ev.text + "\\n";
+  } else if (ev.type === "model"){
+    log("Model: " + ev.model + (ev.fallback_from ? " (fell back from " + ev.fallback_from + ")" : "") +
+        ", predicted " + Math.round(ev.predicted_s) + "s for a " + Math.round(ev.target_s) + "s target");
+  } else if (ev.type === "queued"){
+    document.getElementById('stage').textContent = "queued #" + ev.position + " (~" + Math.round(ev.eta_s) + "s)";
+  } else if (ev.type === "log"){
+    log(ev.message);
+  } else if (ev.type === "done"){
+    document.getElementById('bar').value = 100;
+    document.getElementById('stage').textContent = "done";
+    log("Server finished. Saved files (links):");
+    log(JSON.stringify(ev.saved, null, 2));
+  } else if (ev.type === "error"){
+    log("Server error: " + ev.error);
+  }
+}
+
 async function onStop(){
   log("Finalizing recording…");
   try{
-    const blob = new Blob(recordedChunks, {{type:'audio/webm'}});
-    const file = new File([blob], "browser_capture.webm", {{type:'audio/webm'}});
+    const blob = new Blob(recordedChunks, {type:'audio/webm'});
+    const file = new File([blob], "browser_capture.webm", {type:'audio/webm'});
     const form = new FormData();
     form.append('file', file);
     form.append('model', MODEL);
     form.append('min_spk', String(MIN_SPK));
     form.append('max_spk', String(MAX_SPK));
+    if (ASR_MODE) form.append('asr_mode', ASR_MODE);
+    if (BATCH) form.append('batch_size', BATCH);
+    if (BEAM) form.append('beam_size', BEAM);
+    if (PEOPLE) form.append('participants', PEOPLE);
+    if (TARGET_MIN) form.append('target_s', String(parseFloat(TARGET_MIN) * 60));
+    form.append('stream', 'true');
 
+    document.getElementById('transcript').textContent = "";
     log("Uploading to: " + ENDPOINT);
-    const resp = await fetch(ENDPOINT, {{method:'POST', body: form}});
-    const data = await resp.json();
-    if (data.ok) {{
-      log("Server finished. Saved files (links):");
-      log(JSON.stringify(data.saved, null, 2));
-    }} else {{
-      log("Server error.");
-    }}
+    const resp = await fetch(ENDPOINT, {method:'POST', body: form});
+    if (resp.status === 429) { log("Server busy, try again in " + (resp.headers.get("Retry-After") || "?") + "s."); return; }
+    if (!resp.ok) { log("Server error: HTTP " + resp.status); return; }
+    await readEvents(resp, onEvent);
   }catch(e){
     log("Upload failed: " + e);
   }finally{
-    try{{ tabStream?.getTracks().forEach(t=>t.stop()); micStream?.getTracks().forEach(t=>t.stop()); }}catch(_){ }
+    try{ tabStream?.getTracks().forEach(t=>t.stop()); micStream?.getTracks().forEach(t=>t.stop()); }catch(_){ }
     document.getElementById('start').disabled = false;
     document.getElementById('stop').disabled = true;
   }
 }
 
 document.getElementById('start').onclick = startCapture;
-document.getElementById('stop').onclick  = ()=>{{ if(mediaRecorder && mediaRecorder.state!=='inactive'){{ mediaRecorder.stop(); log("Stopping recorder…"); }} }};
+document.getElementById('stop').onclick  = ()=>{ if(mediaRecorder && mediaRecorder.state!=='inactive'){ mediaRecorder.stop(); log("Stopping recorder…"); } };
 </script>
 </body>
 </html>
     """
 
+# Registered before CORS so CORS stays outermost and 429s stay readable cross-origin.
+@app.middleware("http")
+async def _upload_gate(request: Request, call_next):
+    """Turn away /upload at the per-client limit or a full queue before the multipart body is
+    received: FastAPI reads and spools the whole form before the route handler runs."""
+    if request.method == "POST" and request.url.path == "/upload" and MODELS_READY.is_set():
+        try:
+            ADMISSION.check(_client_id(request))
+        except Rejected as e:
+            return _too_busy(e)
+    return await call_next(request)
+
 
 # CORS (allow Streamlit UI on a different origin/port)
 # server.py (replace the CORS block)
@@ -176,13 +345,37 @@ async def upload_audio(
     model: str = Form(DEFAULT_MODEL),
     min_spk: int = Form(DEFAULT_MIN_SPK),
     max_spk: int = Form(DEFAULT_MAX_SPK),
+    stream: bool = Form(False),
+    asr_mode: str = Form(ASR_MODE),
+    batch_size: int = Form(ASR_BATCH_SIZE),
+    beam_size: int = Form(ASR_BEAM_SIZE),
+    participants: str = Form(""),
+    target_s: float = Form(0.0),
 ):
     """Accepts a browser recording (webm/wav), converts to mono 16k wav,
-    runs your pipeline, saves .md/.srt/.txt, and returns public URLs."""
-    # Timestamped base name
+    runs your pipeline, saves .md/.srt/.txt, and returns public URLs.
+    With stream=true the response is text/event-stream: stage / progress / segment
+    events while the pipeline runs, then a final `done` (or `error`) event.
+    asr_mode=batched decodes VAD chunks `batch_size` at a time (see meeting_transcriber.run_asr).
+    participants: comma-separated names; fixes K and names speakers enrolled in voiceprints.py.
+    model=auto picks the largest model predicted to finish within target_s (default
+    MS_AUTO_TARGET_S) given measured RTFs and the queue; the result carries the plan."""
+    people = [p.strip() for p in participants.split(",") if p.strip()] or None
+    if asr_mode not in ASR_MODES:
+        return JSONResponse({"ok": False, "error": f"asr_mode must be one of {list(ASR_MODES)}"},
+                            status_code=400)
+    if batch_size < 1 or beam_size < 1:
+        return JSONResponse({"ok": False, "error": "batch_size and beam_size must be at least 1"},
+                            status_code=400)
+    if not MODELS_READY.is_set():
+        return JSONResponse({"ok": False, "error": "models loading"}, status_code=503,
+                            headers={"Retry-After": "5"})
+    client = _client_id(request)   # cheap limits were already checked by _upload_gate
+
+    # Timestamped base name; the suffix keeps concurrent uploads in the same second apart
     now = datetime.now().strftime("%Y%m%d_%H%M%S")
     raw_suffix = Path(file.filename).suffix.lower() or ".webm"
-    raw_path = UPLOAD_DIR / f"browser_{now}{raw_suffix}"
+    raw_path = UPLOAD_DIR / f"browser_{now}_{uuid.uuid4().hex[:8]}{raw_suffix}"
 
     # Save upload to disk
     with open(raw_path, "wb") as f:
@@ -193,29 +386,86 @@ async def upload_audio(
     cmd = [
         "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
         "-i", str(raw_path),
-        "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le",
+        "-ac", "1", "-ar", "16000", "-c:a", "pcm_f32le",   # float32: the pipeline maps it without converting
         str(wav_path),
     ]
     subprocess.run(cmd, check=True)
     src_for_asr = wav_path
 
-    # Run transcription + diarization
-    segments = transcribe_and_diarize(src_for_asr, model, min_spk, max_spk)
-    md, srt, txt = save_outputs(src_for_asr, segments)
+    # Cost = audio duration × model RTF; queue it or turn it away now, before any heavy work.
+    try:
+        ticket = ADMISSION.admit(client, model, audio_seconds(wav_path), target_s=target_s or None)
+    except Rejected as e:
+        raw_path.unlink(missing_ok=True)
+        wav_path.unlink(missing_ok=True)
+        return _too_busy(e)
 
     # Build public URLs (served by /files mount)
     base = str(request.base_url).rstrip("/")
     def to_url(p: Path) -> str:
         return f"{base}/files/{p.name}"
 
-    return JSONResponse({
-        "ok": True,
-        "saved": {
-            "md":  to_url(md),
-            "srt": to_url(srt),
-            "txt": to_url(txt),
-        }
-    })
+    def run_job(on_event=None):
+        def queued(position, eta_s):
+            if on_event:
+                on_event({"type": "queued", "position": position, "eta_s": round(eta_s, 1)})
+
+        try:
+            with ticket.run(on_wait=queued):
+                # model=auto: ticket.model was re-checked against the deadline as the job left the queue
+                if ticket.plan and on_event:
+                    on_event({"type": "model", **ticket.plan})
+                segments = transcribe_and_diarize(src_for_asr, ticket.model, min_spk, max_spk,
+                                                  on_event=on_event, asr_mode=asr_mode, batch_size=batch_size,
+                                                  beam_size=beam_size, participants=people)
+                md, srt, txt = save_outputs(src_for_asr, segments)
+            result = {"ok": True, "model": ticket.model,
+                      "saved": {"md": to_url(md), "srt": to_url(srt), "txt": to_url(txt)}}
+            if ticket.plan:
+                result["plan"] = ticket.plan   # prediction vs actual_s turnaround
+            return result
+        finally:
+            _job_finished()
+
+    if stream:
+        return StreamingResponse(_sse_job(run_job), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    # Run transcription + diarization off the event loop so jobs overlap and
+    # THREAD_BUDGET can split cores between them.
+    return JSONResponse(await run_in_threadpool(run_job))
+
+# ---------------------- Server-sent events ----------
+SSE_KEEPALIVE_S = 15.0
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def _sse_job(run_job):
+    """Start `run_job(on_event)` in a worker thread; returns an async generator of its SSE frames."""
+    events = queue.Queue()
+
+    def worker():
+        try:
+            events.put({"type": "done", **run_job(on_event=events.put)})
+        except Exception as e:
+            events.put({"type": "error", "ok": False, "error": f"{type(e).__name__}: {e}"})
+
+    # Start now, not on first iteration: the job holds an admission ticket that must be
+    # released even if the client disconnects before the body is streamed.
+    threading.Thread(target=worker, daemon=True).start()
+    return _relay(events)
+
+async def _relay(events: queue.Queue):
+    while True:
+        try:
+            ev = await run_in_threadpool(events.get, True, SSE_KEEPALIVE_S)
+        except queue.Empty:
+            yield ": keep-alive\n\n"   # long stages emit nothing; keep proxies from timing out
+            continue
+        yield _sse(ev)
+        if ev["type"] in ("done", "error"):
+            return
 
 # ---------------------- Main -----------------------
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+CPU thread budgeting across concurrent transcription jobs.
+
+The host's cores are split evenly between in-flight jobs; each job hands its share to
+whichever stage it is running (embeddings → torch threads). ASR runs with the count its
+CTranslate2 model was loaded with, which the slot records for accounting instead.
+Shares are recomputed whenever a job starts or finishes, and a job that would push the
+host past one thread per core waits for a slot instead of oversubscribing.
+
+    budget = ThreadBudget()
+    with budget.job("meeting.wav") as slot:
+        n = slot.threads("embeddings")      # current share for this stage
+        slot.threads("asr", fixed=4)        # stage with its own thread count
+    budget.snapshot()                       # cores, jobs, allocation, utilization
+"""
+
+from __future__ import annotations
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except Exception:
+        return os.cpu_count() or 1
+
+class JobSlot:
+    """A job's handle on the budget. Threads are looked up on each call, so later
+    stages of a long job pick up rebalanced shares."""
+
+    def __init__(self, budget: "ThreadBudget", job_id: int, name: str):
+        self.budget = budget
+        self.job_id = job_id
+        self.name = name
+        self.stage = "queued"
+        self.share = 1
+        self.fixed = None     # threads the current stage actually runs with, if not `share`
+        self.started = time.monotonic()
+
+    @property
+    def used(self) -> int:
+        return self.fixed or self.share
+
+    def threads(self, stage: str | None = None, fixed: int | None = None) -> int:
+        """Current share for `stage`. A stage whose thread count is set elsewhere (ASR:
+        CTranslate2 fixes it at model load) passes it as `fixed`, so accounting reports
+        what actually runs."""
+        if stage is not None:
+            with self.budget._lock:
+                self.budget._tick()
+                self.stage = stage
+                self.fixed = fixed
+        return self.used
+
+class ThreadBudget:
+    def __init__(self, cores: int | None = None):
+        self.cores = max(1, cores or available_cores())
+        self._lock = threading.Lock()
+        self._free = threading.Condition(self._lock)
+        self._jobs: dict[int, JobSlot] = {}
+        self._ids = itertools.count(1)
+        self._t0 = time.monotonic()
+        self._mark = self._t0
+        self._core_seconds = 0.0     # integral of allocated threads over time
+        self._completed = 0
+        self._waiting = 0
+        self._cpu0 = time.process_time()
+
+    # ---- accounting (call with lock held) ----
+    def _allocated(self) -> int:
+        return sum(s.used for s in self._jobs.values())
+
+    def _tick(self):
+        now = time.monotonic()
+        self._core_seconds += self._allocated() * (now - self._mark)
+        self._mark = now
+
+    def _rebalance(self):
+        """Even split; the oldest jobs get the remainder cores."""
+        self._tick()
+        n = len(self._jobs)
+        if not n:
+            return
+        base, extra = divmod(self.cores, n)
+        for i, slot in enumerate(sorted(self._jobs.values(), key=lambda s: s.job_id)):
+            slot.share = max(1, base + (1 if i < extra else 0))
+
+    # ---- public API ----
+    @contextmanager
+    def job(self, name: str = ""):
+        with self._free:
+            # One thread per job minimum: beyond `cores` jobs, wait rather than oversubscribe.
+            self._waiting += 1
+            while len(self._jobs) >= self.cores:
+                self._free.wait()
+            self._waiting -= 1
+            slot = JobSlot(self, next(self._ids), name)
+            self._jobs[slot.job_id] = slot
+            self._rebalance()
+        try:
+            yield slot
+        finally:
+            with self._free:
+                self._jobs.pop(slot.job_id, None)
+                self._completed += 1
+                self._rebalance()
+                self._free.notify()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._tick()
+            now = time.monotonic()
+            allocated = self._allocated()
+            elapsed = max(1e-9, now - self._t0)
+            return {
+                "cores": self.cores,
+                "allocated_threads": allocated,
+                "utilization": allocated / self.cores,
+                "avg_utilization": self._core_seconds / (elapsed * self.cores),
+                # measured, not allocated: process CPU time over wall time × cores
+                "cpu_utilization": (time.process_time() - self._cpu0) / (elapsed * self.cores),
+                "jobs_waiting": self._waiting,
+                "jobs_completed": self._completed,
+                "jobs": [
+                    {"id": s.job_id, "name": s.name, "stage": s.stage,
+                     "threads": s.used, "running_s": round(now - s.started, 1)}
+                    for s in sorted(self._jobs.values(), key=lambda s: s.job_id)
+                ],
+            }
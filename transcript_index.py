@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Full-text index over the transcript archive (SQLite FTS5, stdlib only).
+
+save_outputs() writes every meeting's segments (speaker, start, end, text) here as it
+saves the .md/.srt/.txt files, replacing that meeting's previous rows in one transaction.
+Existing archives are (re)indexed from their .txt files:
+
+    python transcript_index.py reindex ~/MeetingTranscripts          # new / changed files only
+    python transcript_index.py reindex ~/MeetingTranscripts --rebuild
+    python transcript_index.py search "budget review" --speaker SPEAKER_1
+
+The database (MS_INDEX_DB) runs in WAL mode, so the server's workers and batch_transcribe
+processes can write while /search reads. MS_INDEX=0 turns indexing off.
+"""
+
+from __future__ import annotations
+import argparse
+import numbers
+import os
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Not under ~/MeetingTranscripts: that directory is served as-is at /files.
+INDEX_DB = Path(os.environ.get("MS_INDEX_DB", Path.home() / ".cache" / "meeting_transcriber" / "transcripts.sqlite3"))
+INDEX_ENABLED = os.environ.get("MS_INDEX", "1") == "1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    base TEXT NOT NULL UNIQUE,        -- absolute output path without extension
+    name TEXT NOT NULL,               -- file stem, e.g. browser_20250101_120000_3f2a9c1d
+    source_mtime REAL,                -- mtime of the .txt the rows came from
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    meeting_id INTEGER NOT NULL REFERENCES meetings(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    speaker TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_meeting ON segments(meeting_id, seq);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, speaker, content='segments', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text, speaker) VALUES (new.id, new.text, new.speaker);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text, speaker) VALUES ('delete', old.id, old.text, old.speaker);
+END;
+"""
+
+def connect(db_path: Path | None = None) -> sqlite3.Connection:
+    db_path = Path(db_path or INDEX_DB)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=10.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    return conn
+
+# ---------------------- Writing ----------------------
+def index_segments(base: Path, segments, conn: sqlite3.Connection | None = None, source_mtime=None):
+    """
+    Replace the indexed segments of the meeting whose outputs live at `base` (no extension).
+    segments: list of dict {spk, start, end, text}; spk is a label or a cluster number.
+    """
+    base = Path(base).expanduser().resolve()   # one row per meeting, however the path was spelled
+    own = conn is None
+    conn = conn or connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM meetings WHERE base = ?", (str(base),))   # cascades to segments
+            cur = conn.execute("INSERT INTO meetings(base, name, source_mtime, indexed_at) VALUES (?, ?, ?, ?)",
+                               (str(base), base.name, source_mtime, time.time()))
+            mid = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO segments(meeting_id, seq, speaker, start, end, text) VALUES (?, ?, ?, ?, ?, ?)",
+                [(mid, i, speaker_label(s["spk"]), float(s["start"]), float(s["end"]), s["text"])
+                 for i, s in enumerate(segments)])
+        return mid
+    finally:
+        if own:
+            conn.close()
+
+def speaker_label(spk) -> str:
+    """Cluster number → SPEAKER_n; names and labels read back from a .txt pass through as is.
+    save_outputs writes the transcripts with this too, so /search?speaker= matches them."""
+    return f"SPEAKER_{spk}" if isinstance(spk, numbers.Integral) else str(spk)
+
+# "SPEAKER_0 [12.3-15.9]: text" — the .txt format written by save_outputs
+_TXT_LINE = re.compile(r"^(?P<spk>.+?) \[(?P<start>\d+(?:\.\d+)?)-(?P<end>\d+(?:\.\d+)?)\]: (?P<text>.*)$")
+
+def parse_txt(path: Path):
+    segs = []
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            m = _TXT_LINE.match(line.rstrip("\n"))
+            if m:
+                segs.append({"spk": m["spk"], "start": float(m["start"]), "end": float(m["end"]),
+                             "text": m["text"]})
+    return segs
+
+def reindex(dirs, recursive=False, rebuild=False, conn: sqlite3.Connection | None = None, log=print):
+    """Index every transcript .txt under `dirs`; unchanged files are skipped unless `rebuild`."""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        if rebuild:
+            with conn:
+                conn.execute("DELETE FROM meetings")
+                conn.execute("INSERT INTO segments_fts(segments_fts) VALUES ('rebuild')")
+        seen = {r["base"]: r["source_mtime"] for r in conn.execute("SELECT base, source_mtime FROM meetings")}
+        done = skipped = 0
+        for d in dirs:
+            d = Path(d).expanduser().resolve()
+            files = [d] if d.is_file() else sorted(d.rglob("*.txt") if recursive else d.glob("*.txt"))
+            for txt in files:
+                base = txt.with_suffix("")
+                mtime = txt.stat().st_mtime
+                if seen.get(str(base)) == mtime:
+                    skipped += 1
+                    continue
+                segs = parse_txt(txt)
+                if not segs:
+                    continue   # not one of ours
+                index_segments(base, segs, conn=conn, source_mtime=mtime)
+                done += 1
+        with conn:
+            conn.execute("INSERT INTO segments_fts(segments_fts) VALUES ('optimize')")
+        log(f"Indexed {done} transcript(s), {skipped} unchanged.")
+        return done
+    finally:
+        if own:
+            conn.close()
+
+# ---------------------- Searching ----------------------
+def fts_query(q: str) -> str:
+    """User text → FTS5 query: every word must match, `word*` is a prefix, "a phrase" stays a phrase."""
+    parts = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', q):
+        if phrase:
+            parts.append('"' + phrase.replace('"', "") + '"')
+        else:
+            prefix = word.endswith("*")
+            word = word.rstrip("*").replace('"', "")
+            if word:
+                parts.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(parts)
+
+def search(q: str, limit: int = 20, offset: int = 0, speaker: str | None = None,
+           meeting: str | None = None, conn: sqlite3.Connection | None = None):
+    """Best matches first (bm25). Each hit: meeting, base, speaker, start, end, text, snippet."""
+    match = fts_query(q)
+    if not match:
+        return []
+    sql = ["""SELECT m.name AS meeting, m.base AS base, s.speaker, s.start, s.end, s.text,
+                     snippet(segments_fts, 0, '[', ']', '…', 12) AS snippet
+              FROM segments_fts
+              JOIN segments s ON s.id = segments_fts.rowid
+              JOIN meetings m ON m.id = s.meeting_id
+              WHERE segments_fts MATCH ?"""]
+    args = [match]
+    if speaker:
+        sql.append("AND s.speaker = ?")
+        args.append(speaker)
+    if meeting:
+        sql.append("AND m.name = ?")
+        args.append(meeting)
+    sql.append("ORDER BY bm25(segments_fts) LIMIT ? OFFSET ?")
+    args += [limit, offset]
+    own = conn is None
+    conn = conn or connect()
+    try:
+        return [dict(r) for r in conn.execute(" ".join(sql), args)]
+    finally:
+        if own:
+            conn.close()
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Transcript full-text index.")
+    ap.add_argument("--db", default=None, help=f"Index database (default: {INDEX_DB})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("reindex", help="Index existing transcripts (.txt)")
+    p.add_argument("dirs", nargs="*", default=[str(Path.home() / "MeetingTranscripts")])
+    p.add_argument("-r", "--recursive", action="store_true", help="Recurse into directories")
+    p.add_argument("--rebuild", action="store_true", help="Drop the index and re-read every file")
+
+    p = sub.add_parser("search", help="Query the index")
+    p.add_argument("query")
+    p.add_argument("--speaker", default=None)
+    p.add_argument("--meeting", default=None)
+    p.add_argument("-n", "--limit", type=int, default=20)
+
+    args = ap.parse_args(argv)
+    conn = connect(args.db)
+    try:
+        if args.cmd == "reindex":
+            reindex(args.dirs, recursive=args.recursive, rebuild=args.rebuild, conn=conn)
+        else:
+            t0 = time.perf_counter()
+            hits = search(args.query, limit=args.limit, speaker=args.speaker, meeting=args.meeting, conn=conn)
+            for h in hits:
+                print(f"{h['meeting']}  [{h['start']:.1f}–{h['end']:.1f}] {h['speaker']}: {h['snippet']}")
+            print(f"{len(hits)} hit(s) in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent speaker voiceprints: one L2-normalized ECAPA centroid per enrolled person.
+
+The diarization pipeline uses the store twice:
+- before clustering, every voiced window is scored against all centroids in one
+  matrix product. If enrolled speakers account for nearly all windows, K is taken
+  from them and the silhouette sweep is skipped. Otherwise they set a lower bound on K.
+- after clustering, cluster centroids are matched one-to-one to voiceprints (cosine,
+  Hungarian assignment). Matches above the threshold replace `SPEAKER_n` with the name.
+
+    python voiceprints.py enroll "Alice" alice_intro.wav
+    python voiceprints.py enroll "Bob" standup.wav --range 12.5-48 --range 300-330
+    python voiceprints.py list
+    python voiceprints.py remove "Bob"
+
+Enrolling a name again folds the new audio into its centroid (weighted by window count).
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+VOICEPRINT_DB = Path(os.environ.get("MS_VOICEPRINTS",
+                                    Path.home() / ".cache" / "meeting_transcriber" / "voiceprints.npz"))
+VOICE_MATCH = float(os.environ.get("MS_VOICE_MATCH", 0.5))        # min cosine to accept a name
+VOICE_COVERAGE = float(os.environ.get("MS_VOICE_COVERAGE", 0.9))  # windows explained → skip K sweep
+VOICE_MIN_SHARE = 0.05    # an enrolled speaker counts as present above this share of windows
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    return x / (np.linalg.norm(x, axis=-1, keepdims=True) + 1e-12)
+
+def cluster_centroids(embs: np.ndarray, labels) -> dict:
+    """{label: normalized mean embedding} for each cluster."""
+    labels = np.asarray(labels)
+    return {int(k): _normalize(embs[labels == k].mean(axis=0)) for k in np.unique(labels)}
+
+class VoiceprintStore:
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path or VOICEPRINT_DB)
+        self.names: list[str] = []
+        self.centroids = np.zeros((0, 0), dtype=np.float32)   # [S, D], rows normalized
+        self.counts = np.zeros(0, dtype=np.int64)             # windows behind each centroid
+        self.mtime = None
+
+    def __len__(self):
+        return len(self.names)
+
+    # ---- persistence ----
+    @classmethod
+    def load(cls, path: Path | None = None) -> "VoiceprintStore":
+        store = cls(path)
+        if store.path.exists():
+            with np.load(store.path, allow_pickle=False) as z:
+                store.names = [str(n) for n in z["names"]]
+                store.centroids = z["centroids"].astype(np.float32)
+                store.counts = z["counts"].astype(np.int64)
+            store.mtime = store.path.stat().st_mtime
+        return store
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp.npz")
+        np.savez(tmp, names=np.asarray(self.names, dtype=str), centroids=self.centroids, counts=self.counts)
+        os.replace(tmp, self.path)   # atomic: running servers never read a partial file
+        self.mtime = self.path.stat().st_mtime
+
+    # ---- enrollment ----
+    def enroll(self, name: str, embs: np.ndarray):
+        """Fold window embeddings [N, D] of one person into their centroid."""
+        embs = _normalize(np.atleast_2d(embs))
+        n = len(embs)
+        if not n:
+            raise ValueError(f"no embeddings to enroll for {name!r}")
+        mean = embs.mean(axis=0)
+        if name in self.names:
+            i = self.names.index(name)
+            total = self.counts[i] + n
+            self.centroids[i] = _normalize((self.centroids[i] * self.counts[i] + mean * n) / total)
+            self.counts[i] = total
+            return
+        if len(self) and self.centroids.shape[1] != embs.shape[1]:
+            raise ValueError(f"embedding dim {embs.shape[1]} != store dim {self.centroids.shape[1]}")
+        self.names.append(name)
+        self.centroids = np.vstack([self.centroids.reshape(-1, embs.shape[1]), _normalize(mean)[None]])
+        self.counts = np.append(self.counts, n)
+
+    def remove(self, name: str):
+        i = self.names.index(name)
+        del self.names[i]
+        self.centroids = np.delete(self.centroids, i, axis=0)
+        self.counts = np.delete(self.counts, i)
+
+    # ---- lookup ----
+    def _subset(self, candidates=None):
+        if candidates is None:
+            return list(range(len(self)))
+        return [self.names.index(n) for n in candidates if n in self.names]
+
+    def similarity(self, embs: np.ndarray, candidates=None):
+        """Cosine matrix [N, S'] of normalized embeddings vs (candidate) voiceprints, and their names."""
+        idx = self._subset(candidates)
+        return _normalize(np.atleast_2d(embs)) @ self.centroids[idx].T, [self.names[i] for i in idx]
+
+    def detect(self, embs: np.ndarray, threshold: float = VOICE_MATCH):
+        """
+        Enrolled speakers present in a meeting, from its window embeddings.
+        Returns (names, coverage): speakers owning > VOICE_MIN_SHARE of windows, and the
+        share of windows confidently explained by them.
+        """
+        if not len(self) or not len(embs):
+            return [], 0.0
+        sim, names = self.similarity(embs)
+        best = sim.argmax(axis=1)
+        confident = sim[np.arange(len(best)), best] >= threshold
+        share = np.bincount(best[confident], minlength=len(names)) / len(best)
+        present = np.flatnonzero(share > VOICE_MIN_SHARE)
+        return [names[i] for i in present], float(share[present].sum())
+
+    def match(self, centroids: dict, threshold: float = VOICE_MATCH, candidates=None) -> dict:
+        """One-to-one cluster → name assignment: {label: name} for pairs with cosine ≥ threshold."""
+        if not len(self) or not centroids:
+            return {}
+        from scipy.optimize import linear_sum_assignment
+        labels = list(centroids)
+        sim, names = self.similarity(np.stack([centroids[k] for k in labels]), candidates)
+        if not names:
+            return {}
+        rows, cols = linear_sum_assignment(-sim)
+        return {labels[r]: names[c] for r, c in zip(rows, cols) if sim[r, c] >= threshold}
+
+# ---------------------- Process-wide store ----------------------
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+def get_store() -> VoiceprintStore:
+    """The store at VOICEPRINT_DB, reloaded when the file changes (e.g. enrolled from the CLI)."""
+    global _STORE
+    with _STORE_LOCK:
+        mtime = VOICEPRINT_DB.stat().st_mtime if VOICEPRINT_DB.exists() else None
+        if _STORE is None or _STORE.mtime != mtime:
+            _STORE = VoiceprintStore.load(VOICEPRINT_DB)
+        return _STORE
+
+# ---------------------- CLI ----------------------
+def _parse_range(s: str):
+    a, b = s.split("-", 1)
+    return float(a), float(b)
+
+def cmd_enroll(args):
+    import meeting_transcriber as mt
+    store = VoiceprintStore.load(args.db)
+    n = 0
+    for path in args.audio:
+        audio, sr = mt.load_audio_mono16k(path)
+        spans = args.range or [(0.0, len(audio) / sr)]
+        for st, en in spans:
+            _, embs, ok = mt.compute_embeddings(audio[int(st * sr):int(en * sr)], sr, backend=args.backend,
+                                                mode="uniform")
+            if ok:
+                store.enroll(args.name, embs)
+                n += len(embs)
+    if not n:
+        print(f"No voiced audio found for {args.name!r}; nothing enrolled.")
+        return 1
+    store.save()
+    print(f"Enrolled {args.name!r} from {n} window(s) → {store.path}")
+    return 0
+
+def cmd_list(args):
+    store = VoiceprintStore.load(args.db)
+    if not len(store):
+        print(f"No voiceprints in {store.path}")
+    for name, count in zip(store.names, store.counts.tolist()):
+        print(f"{name:<24} {count:6d} windows")
+    return 0
+
+def cmd_remove(args):
+    store = VoiceprintStore.load(args.db)
+    if args.name not in store.names:
+        print(f"{args.name!r} is not enrolled.")
+        return 1
+    store.remove(args.name)
+    store.save()
+    print(f"Removed {args.name!r}.")
+    return 0
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Speaker voiceprint store.")
+    ap.add_argument("--db", default=None, help=f"Store file (default: {VOICEPRINT_DB})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("enroll", help="Add / extend a person's voiceprint from recordings of them")
+    p.add_argument("name")
+    p.add_argument("audio", nargs="+", help="Recordings where `name` is speaking")
+    p.add_argument("--range", type=_parse_range, action="append",
+                   help="START-END seconds to use (repeatable; default: whole file)")
+    p.add_argument("--backend", default=None, help="Embedding backend (default: MS_EMB_BACKEND)")
+    p.set_defaults(func=cmd_enroll)
+
+    p = sub.add_parser("list", help="Show enrolled speakers")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("remove", help="Delete a voiceprint")
+    p.add_argument("name")
+    p.set_defaults(func=cmd_remove)
+
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())